@@ -42,6 +42,11 @@ class CmdHardcodeCompiler(CoreUnixCommand):
     """
     Hardcode Compiler. Allows you to test a program.
 
+    Shows the program's models against your core's current registry and
+    sensors, how big its grounding is and how long it took to ground and
+    solve. Rules whose grounding grows faster than the ships and sensor
+    facts they read are flagged.
+
     Usage:
     hcc program
     """
@@ -298,6 +303,9 @@ class CmdCoreShowRunningPrograms(CoreUnixCommand):
         caller.msg("Running Programs:")
         caller.msg(", ".join(program for program in caller.running_programs))
 
+        queue = caller.command_queue
+        caller.msg(f"Commands: {queue.executed} run, {queue.coalesced} coalesced, {queue.dropped} dropped (budget {caller.commands_per_tick} per tick)")
+
 class CmdCoreToggleNoisy(CoreUnixCommand):
     """
     Have the core report every simulation loops' output.
@@ -341,6 +349,8 @@ class CmdCoreShowLogs(CoreUnixCommand):
 
     Usage:
        logs 
+       logs --level info
+       logs --lines 30
     """
 
     key = "logs"
@@ -348,9 +358,19 @@ class CmdCoreShowLogs(CoreUnixCommand):
     locks = "cmd:false()"
     help_category = "Core Binaries"
 
+    def init_parser(self):
+        self.parser.add_argument("--level", "-l", default="debug", choices=["debug", "info", "warning", "error"], help="Only show lines at this level or above.")
+        self.parser.add_argument("--lines", "-n", type=int, default=10, help="How many of the latest lines to show.")
+
     def func(self):
         caller = self.caller
-        caller.msg("\n".join(caller.logs[-10:]))
+
+        # [-0:] would be every line
+        if self.opts.lines < 1:
+            caller.msg("|r--lines must be at least 1.")
+            return
+
+        caller.msg("\n".join(caller.logs.lines(self.opts.level)[-self.opts.lines:]))
 
 class CmdCoreShowLastError(CoreUnixCommand):
     """
@@ -15,7 +15,7 @@ own cmdsets by inheriting from them or directly from `evennia.CmdSet`.
 """
 
 from evennia import default_cmds
-from typeclasses.objects import CmdBootstrapSpaceroom, VehicleEntryCmdSet
+from typeclasses.objects import CmdBootstrapSpaceroom, CmdSimulationStats, VehicleEntryCmdSet
 from commands.command import SignalUnloggedinLook
 
 class CharacterCmdSet(default_cmds.CharacterCmdSet):
@@ -32,6 +32,7 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         Populates the cmdset
         """
         self.add(CmdBootstrapSpaceroom)
+        self.add(CmdSimulationStats)
         #
         # any commands you add below will overload the default ones.
         super().at_cmdset_creation()
@@ -0,0 +1,85 @@
+import time
+
+
+class SolveBudgetExceeded(RuntimeError):
+    pass
+
+
+class SolveBudget:
+    """
+    Limits for one ground and solve of a program: timeout is wall-clock seconds
+    for grounding and solving together, max_atoms caps the size of the ground
+    program. None turns either off. The timeout is wall-clock on purpose, not
+    CPU time, since it's the tick's deadline the solve has to make.
+
+    clingo can't interrupt grounding, so grounding is checked once it returns
+    and the solve only gets whatever time is left. Solving runs asynchronously
+    and is cancelled when the time runs out. Overruns raise
+    SolveBudgetExceeded with the clingo statistics that explain them.
+    """
+
+    def __init__(self, timeout=None, max_atoms=None):
+        self.timeout = timeout
+        self.max_atoms = max_atoms
+        self.ground_time = 0.0
+        self.atoms = 0
+
+    def ground(self, ctl, parts=None):
+        started = time.monotonic()
+        ctl.ground(parts or [("base", [])])
+        self.ground_time = time.monotonic() - started
+        self.atoms = len(ctl.symbolic_atoms)
+
+        if self.max_atoms != None and self.atoms > self.max_atoms:
+            raise SolveBudgetExceeded(f"Grounding produced {self.atoms} atoms, over the budget of {self.max_atoms}.")
+
+        if self.timeout != None and self.ground_time >= self.timeout:
+            raise SolveBudgetExceeded(f"Grounding took {self.ground_time:.2f}s, over the budget of {self.timeout}s.")
+
+    def solve(self, ctl, on_model):
+        if self.timeout == None:
+            return ctl.solve(on_model=on_model)
+
+        with ctl.solve(on_model=on_model, async_=True) as handle:
+            finished = handle.wait(self.timeout - self.ground_time)
+
+            if not finished:
+                handle.cancel()
+            result = handle.get()
+
+        if not finished:
+            raise SolveBudgetExceeded(f"Solving was interrupted after the budget of {self.timeout}s ran out. {self.describe(ctl)}")
+
+        return result
+
+    def statistics(self, ctl):
+        # Grounding size and where the time went. Solve figures are 0 until clingo has solved.
+        statistics = {"atoms": self.atoms, "ground": self.ground_time}
+
+        try:
+            lp = ctl.statistics["problem"]["lp"]
+            solvers = ctl.statistics["solving"]["solvers"]
+            times = ctl.statistics["summary"]["times"]
+        except (KeyError, RuntimeError, TypeError):
+            return statistics
+
+        statistics.update(
+            rules=int(lp["rules"]),
+            bodies=int(lp["bodies"]),
+            solve=times["solve"],
+            cpu=times["cpu"],
+            choices=int(solvers["choices"]),
+            conflicts=int(solvers["conflicts"]),
+        )
+
+        return statistics
+
+    def describe(self, ctl):
+        statistics = self.statistics(ctl)
+        text = f"Ground: {self.ground_time:.2f}s, {self.atoms} atoms."
+
+        if "rules" in statistics:
+            text += f" Rules: {statistics['rules']}, bodies: {statistics['bodies']}."
+            text += f" Solve: {statistics['solve']:.2f}s, {statistics['cpu']:.2f}s cpu, {statistics['choices']} choices, {statistics['conflicts']} conflicts."
+
+        return text
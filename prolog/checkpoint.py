@@ -0,0 +1,105 @@
+import threading
+
+from django.conf import settings
+from evennia import AttributeProperty
+
+CHECKPOINT_INTERVAL = getattr(settings, "SIMULATION_CHECKPOINT_INTERVAL", 30)
+
+
+class CheckpointStore:
+    """
+    Writes to CheckpointedAttributeProperty values that haven't reached the
+    database yet, keyed by (object id, attribute key). Kept apart from the
+    objects themselves so a pending value survives the object being evicted
+    from the idmapper cache and loaded again.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.objects = {}
+
+    def get(self, obj, key, default=None):
+        return self.pending.get((obj.id, key), default)
+
+    def has(self, obj, key):
+        return (obj.id, key) in self.pending
+
+    def set(self, obj, prop, value):
+        with self.lock:
+            self.pending[(obj.id, prop._key)] = value
+            _, props = self.objects.setdefault(obj.id, (obj, {}))
+            props[prop._key] = prop
+
+    def flush(self, obj=None):
+        # Persist everything pending, or only obj's values. Returns how many were written.
+        with self.lock:
+            if obj == None:
+                objects = self.objects
+                self.objects = {}
+            else:
+                entry = self.objects.pop(obj.id, None)
+                objects = {obj.id: entry} if entry else {}
+
+            writes = []
+            for id, (target, props) in objects.items():
+                for key, prop in props.items():
+                    writes.append((target, prop, self.pending.pop((id, key))))
+
+        for target, prop, value in writes:
+            try:
+                prop.persist(target, value)
+            except Exception as e:
+                # Most likely deleted since the write
+                print(f"Could not checkpoint {prop._key} on {target}: {e}")
+
+        return len(writes)
+
+    def discard(self, obj):
+        # Drop obj's pending values without writing them, for objects being deleted
+        with self.lock:
+            entry = self.objects.pop(obj.id, None)
+
+            if entry:
+                for key in entry[1]:
+                    self.pending.pop((obj.id, key), None)
+
+    def __len__(self):
+        return len(self.pending)
+
+
+CHECKPOINTS = CheckpointStore()
+
+
+class CheckpointedAttributeProperty(AttributeProperty):
+    """
+    An AttributeProperty for hot counters: writes land in CHECKPOINTS and reach
+    the database only when flushed, every CHECKPOINT_INTERVAL seconds, on
+    power-off and at server stop. A crash loses at most one interval.
+
+    Owners should flush_checkpoints(self) in at_idmapper_flush, and discard
+    theirs in at_object_delete.
+    """
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        if CHECKPOINTS.has(instance, self._key):
+            return CHECKPOINTS.get(instance, self._key)
+
+        return super().__get__(instance, owner)
+
+    def __set__(self, instance, value):
+        CHECKPOINTS.set(instance, self, value)
+
+    def persist(self, instance, value):
+        super().__set__(instance, value)
+
+
+def flush_checkpoints(obj=None):
+    return CHECKPOINTS.flush(obj)
+
+
+def discard_checkpoints(obj):
+    CHECKPOINTS.discard(obj)
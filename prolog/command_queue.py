@@ -0,0 +1,45 @@
+import threading
+
+
+class CommandQueue:
+    """
+    Commands a core's programs emitted during one tick, waiting to be run on the
+    reactor thread. The same command queued twice in a tick runs once, and
+    draining hands out at most a budget of them; the rest are dropped and
+    counted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+        self.queued = set()
+        self.dropped = 0
+        self.coalesced = 0
+        self.executed = 0
+
+    def push(self, command):
+        # False when the command was already waiting this tick
+        with self.lock:
+            if command in self.queued:
+                self.coalesced += 1
+                return False
+
+            self.queued.add(command)
+            self.pending.append(command)
+            return True
+
+    def drain(self, budget):
+        # (commands to run, how many were dropped over budget), in the order they were queued
+        with self.lock:
+            batch = self.pending[:max(budget, 0)]
+            dropped = len(self.pending) - len(batch)
+
+            self.pending = []
+            self.queued = set()
+            self.dropped += dropped
+            self.executed += len(batch)
+
+        return batch, dropped
+
+    def __len__(self):
+        return len(self.pending)
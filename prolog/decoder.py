@@ -0,0 +1,38 @@
+def numbers(symbol, text=None):
+    # The integer arguments of a flat symbol like f(1,-2,3). clingo's python
+    # bindings make every .name, .arguments and .number read its own C call,
+    # so formatting the symbol once and splitting it is the cheaper read.
+    if text == None:
+        text = str(symbol)
+
+    return [int(argument) for argument in text[text.index("(") + 1:-1].split(",")]
+
+
+class ModelDecoder:
+    """
+    Reads a model's shown symbols: each symbol is dispatched on its name to a
+    handler(symbol, text), and whatever the handlers return (anything but
+    None) is collected in order. Every symbol is formatted exactly once.
+    """
+
+    def __init__(self, handlers=None):
+        self.handlers = dict(handlers or {})
+
+    def register(self, name, handler):
+        self.handlers[name] = handler
+
+    def decode(self, symbols):
+        results = []
+        handlers = self.handlers
+
+        for symbol in symbols:
+            text = str(symbol)
+            handler = handlers.get(text.partition("(")[0])
+
+            if handler:
+                result = handler(symbol, text)
+
+                if result != None:
+                    results.append(result)
+
+        return results
@@ -0,0 +1,108 @@
+from prolog.program_cache import parse_program
+
+try:
+    from clingo.ast import AST, ASTSequence, ASTType, ComparisonOperator, Sign
+except ImportError:
+    AST = None
+
+# Facts that grow with the world: one body/9 for every ship a sensor can see
+SCALING_PREDICATES = ("body",)
+
+
+def predicate_name(literal):
+    # Name of a positive body literal's predicate, None for anything else
+    if literal.ast_type != ASTType.Literal or literal.sign != Sign.NoSign:
+        return None
+
+    atom = literal.atom
+
+    if atom.ast_type != ASTType.SymbolicAtom or atom.symbol.ast_type != ASTType.Function:
+        return None
+
+    return atom.symbol.name
+
+
+def is_equality(literal):
+    # X = Y binds one side from the other, so it joins like a shared variable
+    if literal.ast_type != ASTType.Literal or literal.sign != Sign.NoSign or literal.atom.ast_type != ASTType.Comparison:
+        return False
+
+    return all(guard.comparison == ComparisonOperator.Equal for guard in literal.atom.guards)
+
+
+def variables(node, found=None):
+    # Named variables under an AST node. Every _ is a fresh variable and joins nothing.
+    if found == None:
+        found = set()
+
+    if isinstance(node, AST):
+        if node.ast_type == ASTType.Variable:
+            if node.name != "_":
+                found.add(node.name)
+        else:
+            for key in node.child_keys:
+                variables(getattr(node, key), found)
+    elif isinstance(node, ASTSequence):
+        for item in node:
+            variables(item, found)
+
+    return found
+
+
+def fact_predicates(text):
+    # Names of the predicates text defines, e.g. what a core's sensors report
+    names = set()
+
+    for statement in parse_program(text) or []:
+        if statement.ast_type == ASTType.Rule and statement.head.ast_type == ASTType.Literal:
+            name = predicate_name(statement.head)
+
+            if name != None:
+                names.add(name)
+
+    return names
+
+
+def superlinear_rules(text, scaling=SCALING_PREDICATES):
+    """
+    Rules whose grounding grows faster than the scaling facts they read.
+
+    The positive body literals of a rule are grouped by the variables they
+    share, since the grounder joins literals through shared variables and
+    takes the cross product of everything else. A rule with scaling literals
+    in k separate groups grounds on the order of N^k instances for N facts.
+    Comparisons like A != B only filter that product, they don't shrink it.
+
+    Returns (line, degree, rule text) for every rule with k of 2 or more.
+    Literals in conditions and aggregates are not looked at.
+    """
+    flagged = []
+
+    for statement in parse_program(text) or []:
+        if statement.ast_type != ASTType.Rule:
+            continue
+
+        # Union the positive literals that share a variable
+        groups = []
+
+        for literal in statement.body:
+            name = predicate_name(literal)
+
+            if name == None and not is_equality(literal):
+                continue
+
+            group = (variables(literal), name in scaling)
+            joined = [other for other in groups if other[0] & group[0]]
+
+            for other in joined:
+                groups.remove(other)
+                group = (group[0] | other[0], group[1] or other[1])
+
+            groups.append(group)
+
+        degree = len([group for group in groups if group[1]])
+
+        if degree >= 2:
+            flagged.append((statement.location.begin.line, degree, str(statement)))
+
+    return flagged
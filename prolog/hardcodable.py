@@ -7,8 +7,15 @@ from evennia import AttributeProperty
 from evennia.typeclasses.attributes import NAttributeProperty
 from typeclasses.objects import Object
 from prolog.simulatable import Simulatable
-import re
+from prolog.program_cache import CompiledProgramSet, PROGRAM_STORE
+from prolog.log_buffer import LogBuffer
+from prolog.command_queue import CommandQueue
+from prolog.reactor import MAILBOX
+from prolog.budget import SolveBudgetExceeded
+from prolog.solve_memo import SOLVE_MEMO, fingerprint
+from prolog.grounding_cost import SCALING_PREDICATES, fact_predicates, superlinear_rules
 from evennia.utils.eveditor import EvEditor
+from django.conf import settings
 from evennia.utils.evtable import EvTable
 import traceback
 
@@ -23,8 +30,19 @@ class Hardcodable(Object, Simulatable):
 
     clock_speed = AttributeProperty(default=1)
 
-    logs = NAttributeProperty(default=[])
+    # Lines kept in the logs ring buffer, the oldest are dropped first
+    log_capacity = AttributeProperty(default=200)
+
+    # Most commands a core's programs can run per tick, the rest are dropped
+    commands_per_tick = AttributeProperty(default=5)
+
+    # Per-core solve budget, seconds to ground and solve and most ground atoms
+    solve_timeout = AttributeProperty(default=getattr(settings, "SIMULATION_SOLVE_TIMEOUT", None))
+    max_ground_atoms = AttributeProperty(default=getattr(settings, "SIMULATION_MAX_GROUND_ATOMS", None))
     
+    # Cores with the same programs and facts share solve results
+    solve_memo = SOLVE_MEMO
+
     sensors = NAttributeProperty(default=[])
 
     debugging = NAttributeProperty(default=False)
@@ -35,6 +53,38 @@ class Hardcodable(Object, Simulatable):
 
     noisy = False
 
+    # Shown predicates that make the core act, name -> handler method taking the
+    # symbol's arguments list. Subclasses add their own with {**Hardcodable.actions, ...}.
+    actions = {
+        "command": "action_command",
+        "set_register": "action_set_register",
+        "log": "action_log",
+    }
+
+    # Programs run last in a tick, after power and physics
+    simulation_phase = "programs"
+
+    @property
+    def logs(self):
+        # In memory only, like the list it replaces. Created lazily since typeclasses can't take an __init__.
+        buffer = getattr(self, "_logs", None)
+
+        if buffer == None:
+            buffer = self._logs = LogBuffer(self.log_capacity)
+        elif buffer.capacity != self.log_capacity:
+            buffer.resize(self.log_capacity)
+
+        return buffer
+
+    @property
+    def command_queue(self):
+        queue = getattr(self, "_command_queue", None)
+
+        if queue == None:
+            queue = self._command_queue = CommandQueue()
+
+        return queue
+
     def set_registry(self, slot, fact):
         self.registry[slot] = fact
         return True
@@ -52,6 +102,47 @@ class Hardcodable(Object, Simulatable):
     def to_fact(self):
         return ""
 
+    def to_symbols(self):
+        return []
+
+    def simulation_scope(self):
+        # A core only sees its own sensors
+        return list(self.sensors)
+
+    def simulation_program(self):
+        # Only the running programs; the registry, sensor facts and currentTime change
+        # between ticks and come in through simulation_facts()
+        return self.compiled_program()
+
+    def simulation_facts(self):
+        symbols, facts = super().simulation_facts()
+        return [("currentTime", (int(time.time()),))] + symbols, [self.compile_registry()] + facts
+
+    def compiled_program(self):
+        # The running programs, until one is loaded, run, killed or its text changes
+        # however it's written. Each is parsed once for every core running the same
+        # text, in PROGRAM_STORE.
+        signature = tuple((key, PROGRAM_STORE.key(program.to_fact())) for key, program in self.running_programs.items())
+        cached = getattr(self, "_compiled_program", None)
+
+        if cached == None or cached[0] != signature:
+            compiled = CompiledProgramSet([PROGRAM_STORE.get(program.to_fact(), logger=self.control_logger_callback) for _, program in self.running_programs.items()])
+            cached = self._compiled_program = (signature, compiled)
+
+        return cached[1]
+
+    def memo_key(self, program, symbols, facts):
+        # Everything but currentTime, which changes every tick. Programs that read
+        # it, or that asked not to be, are solved every time.
+        if program.reads_time or not all(getattr(running, "memoizable", True) for running in self.running_programs.values()):
+            return None
+
+        symbols = [symbol for symbol in symbols if not (isinstance(symbol, tuple) and symbol[0] == "currentTime")]
+        return fingerprint(program.digest, symbols, facts)
+
+    def invalidate_compiled_program(self):
+        self._compiled_program = None
+
     def at_init(self):
         self.track(self)
         return True
@@ -76,6 +167,9 @@ class Hardcodable(Object, Simulatable):
     def compile_sensor_facts(self):
         return "%Facts from Sensors\n\n" + "\n".join([ sensor.to_fact() for sensor in self.sensors])
 
+    def compile_programs(self):
+        return "\n".join([ program.to_fact() for _, program in self.running_programs.items()])
+
     def program(self):
         # Gather terms from all the sensors, these are our facts.
         current_time = int(time.time())
@@ -86,7 +180,7 @@ class Hardcodable(Object, Simulatable):
         fact_section = prepend + registry_section + "\n\n" + self.compile_sensor_facts()
 
         # Inject the running programs beneath the sensor data
-        program_section = "\n".join([ program.to_fact() for _, program in self.running_programs.items()])
+        program_section = self.compile_programs()
 
         output = "%Facts from sensors.\n" + fact_section + "\n\n%User Hardcode\n" + program_section
 
@@ -110,7 +204,8 @@ class Hardcodable(Object, Simulatable):
 
         if possible_program != None:
             self.loaded_programs[program_key] = possible_program
-            self.logs.append(f"Program loaded: {program_key}")
+            self.invalidate_compiled_program()
+            self.logs.info(f"Program loaded: {program_key}")
             return True
         else:
             return False
@@ -127,8 +222,9 @@ class Hardcodable(Object, Simulatable):
             return False
         else:
             self.running_programs[program_key] = possible_program
+            self.invalidate_compiled_program()
 
-            self.logs.append(f"Adding to running programs: {program_key}")
+            self.logs.info(f"Adding to running programs: {program_key}")
 
             self.reload()
 
@@ -139,7 +235,8 @@ class Hardcodable(Object, Simulatable):
 
         if possible_program:
             del self.running_programs[program_key]
-            self.logs.append(f"Killed running program: {program_key}")
+            self.invalidate_compiled_program()
+            self.logs.info(f"Killed running program: {program_key}")
 
             return True
         else:
@@ -153,7 +250,7 @@ class Hardcodable(Object, Simulatable):
             del self.loaded_programs[program_key]
 
         # If it's NOT in loaded_programs, it's def not loaded?
-        self.logs.append(f"Program unloaded: {program_key}")
+        self.logs.info(f"Program unloaded: {program_key}")
         return True
 
     def edit_program(self, program_key):
@@ -167,50 +264,108 @@ class Hardcodable(Object, Simulatable):
         # show a single string summarizing the information. A prompt.
         pass
 
+    def simulate(self):
+        result = super().simulate()
+
+        # Posted behind this tick's update()s, so its commands are all queued by then
+        MAILBOX.post(self.run_queued_commands, key=(id(self), "commands"), on_error=self.record_failure)
+
+        return result
+
+    def run_queued_commands(self):
+        # On the reactor thread: run what this tick's programs asked for, within budget
+        budget = self.commands_per_tick
+        commands, dropped = self.command_queue.drain(budget)
+
+        if dropped:
+            self.logs.warning("Dropped {} commands over the budget of {} per tick.", dropped, budget)
+
+        for command in commands:
+            self.logs.info("Executing command: {}", command)
+            self.execute_command(command)
+
     # This is after we ran the simulation, internally Simulatable will call this
     def update(self, model):
-        self.logs.append(f"Execution loop complete.")
+        self.logs.debug("Execution loop complete.")
         self.parse_clingo_symbols(model.symbols(shown=True))
 
     def control_logger_callback(self, code, str):
+        # Called from the solving thread, the message goes out on the reactor
         error_string = f"|rSimulation Log:\n|y{code}\n{str}"
-        self.msg(error_string)
+        MAILBOX.post(self.msg, error_string)
+        self.logs.error(error_string)
 
         self.failure = True
         self.last_error = error_string
 
     def parse_clingo_symbols(self, clingo_symbols):
         # This is where we will look for actual commands to fire.
-        self.logs.append(f"Received output from last loop: ")
-        self.logs.append(f"{clingo_symbols}")
+        self.logs.debug("Received output from last loop: ")
+        # Formatted only if someone reads the logs
+        self.logs.debug("{}", clingo_symbols)
 
         if self.noisy:
             self.msg("")
             self.msg(f"Simulation Truths: \n{clingo_symbols}")
 
+        # Each distinct action runs once, even when the symbols repeat
+        seen = set()
+
         for symbol in clingo_symbols:
-            pattern = re.compile(r'command\("(.*?)"\)')
-            match_object = re.match(pattern, str(symbol))
+            if symbol.type != clingo.SymbolType.Function or symbol in seen:
+                continue
+
+            handler = self.actions.get(symbol.name)
+
+            if handler != None:
+                seen.add(symbol)
+                getattr(self, handler)(symbol.arguments)
+
+    def action_command(self, arguments):
+        # command("look")
+        if len(arguments) != 1 or arguments[0].type != clingo.SymbolType.String:
+            return
+
+        command = arguments[0].string
+
+        if self.debugging:
+            self.logs.debug("MATCHED COMMAND: ")
+
+        # Run later on the reactor thread, never from the simulation thread
+        self.command_queue.push(command)
 
-            if match_object:
-                if self.debugging:
-                    self.logs.append("MATCHED COMMAND: ")
-                self.logs.append("Executing command: " + match_object.group(1))
-               #self.logs.append(f"Output from command: {self.execute_command(match_object.group(1))}")
-                self.execute_command(match_object.group(1))    
+    def action_set_register(self, arguments):
+        # set_register(3, "maxVelocity(2).") fills a registry slot from the next tick on
+        if len(arguments) != 2 or arguments[0].type != clingo.SymbolType.Number:
+            return
+
+        slot, fact = arguments[0].number, arguments[1]
+
+        if 0 <= slot < len(self.registry):
+            text = fact.string if fact.type == clingo.SymbolType.String else f"{fact}."
+            self.set_registry(slot, text)
+            self.logs.info(f"Register {slot} set: {text}")
+
+    def action_log(self, arguments):
+        # log("text") or log(term)
+        if len(arguments) != 1:
+            return
+
+        message = arguments[0]
+        self.logs.info("Program log: {}", message.string if message.type == clingo.SymbolType.String else message)
 
     def add_sensor(self, sensor_obj):
         if not sensor_obj in self.sensors:
             self.sensors.append(sensor_obj)
 
-        self.logs.append(f"Sensor connected: {sensor_obj}")
+        self.logs.info(f"Sensor connected: {sensor_obj}")
         return True
 
     def remove_sensor(self, sensor_obj):
         if sensor_obj in self.sensors:
             self.sensors.remove(sensor_obj)
 
-        self.logs.append(f"Sensor disconnected: {sensor_obj}")
+        self.logs.info(f"Sensor disconnected: {sensor_obj}")
         return True
 
     def view_data_stream(self):
@@ -224,6 +379,10 @@ class Hardcodable(Object, Simulatable):
 class HardcodeProgram(Object):
     hardcode_content = AttributeProperty(default="")
 
+    # False for programs whose output shouldn't be reused when the core's facts
+    # repeat. Programs reading currentTime are never reused anyway.
+    memoizable = AttributeProperty(default=True)
+
     def __str__(self):
         return f"{self.key} \n\n {self.hardcode_content}"
 
@@ -246,6 +405,15 @@ class HardcodeProgram(Object):
     def one_shot(self, caller):
         pass
 
+    def cost_warnings(self, core):
+        # Rules that ground superlinearly in the body/9 and sensor facts the core will feed them
+        scaling = set(SCALING_PREDICATES) | fact_predicates(core.compile_sensor_facts())
+        return superlinear_rules(self.hardcode_content, scaling)
+
+    def report_cost_warnings(self, core, warnings):
+        for line, degree, rule in warnings:
+            core.msg(f"|yLine {line}: joins {degree} groups of body/sensor facts without shared variables, grounding grows as N^{degree}.\n|y  {rule}")
+
     def test_program(self, caller):
         def control_logger_callback(code, str):
             error_string = "|rSimulation Log:\n|y{code}\n{str}"
@@ -266,21 +434,33 @@ class HardcodeProgram(Object):
             program = prepend + core.compile_registry() + "\n\n" + core.compile_sensor_facts() + self.hardcode_content
 
             ctl.add('base', [], program)
-            ctl.ground([("base", [])])
+            warnings = self.cost_warnings(core)
+
+            budget = core.solve_budget()
+            budget.ground(ctl)
             
-            def on_clingo_model(model):
+            # The solve runs on clingo's thread, so collect the models and message from this one
+            models = []
+            budget.solve(ctl, lambda model: models.append(model.symbols(shown=True)))
+            statistics = budget.statistics(ctl)
+            ctl.cleanup()
+
+            for symbols in models:
                 core.msg(f"|gHardcode Program Test: '{self.key}")
                 core.msg("---------------")
                 core.msg(f"|b{program}")
-                for symbol in model.symbols(shown=True):
+                for symbol in symbols:
                     core.msg(f"|y{symbol}")
 
                 core.msg("---------------")
                 core.msg(f"|gProgram '{self.key}' Test End.")
                 core.msg("")
-                
-            ctl.solve(on_model=on_clingo_model)
-            ctl.cleanup()
+
+            core.msg(f"|gGrounding: {statistics['atoms']} atoms, {statistics.get('rules', 0)} rules. Ground {statistics['ground']:.3f}s, solve {statistics.get('solve', 0):.3f}s.")
+            self.report_cost_warnings(core, warnings)
+        except SolveBudgetExceeded as e:
+            core.msg(f"|rProgram '{self.key}' is over the core's budget: {e}")
+            self.report_cost_warnings(core, warnings)
         except RuntimeError as e:
             pass
             #core.msg(e.__cause__)
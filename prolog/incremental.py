@@ -0,0 +1,94 @@
+import clingo
+
+from prolog.program_cache import add_program
+
+
+class IncrementalControl:
+    """
+    A long-lived clingo Control for simulations whose inputs change a little
+    every tick.
+
+    The program's base part is grounded once. Each input (keyed, usually by
+    object id) is grounded through a parameterized program part whose last
+    parameter is a generation number, and is guarded by an #external atom
+    named `guard(key, generation)`. Feeding a changed input releases the old
+    external and grounds a fresh part, so grounding cost follows what changed
+    instead of everything being tracked.
+
+    Released parts stay in the ground program, so the Control is rebuilt once
+    enough stale parts pile up. Pass the program's pre-parsed statements to
+    skip re-parsing on those rebuilds.
+    """
+
+    def __init__(self, program, part="body", guard="live", logger=None, rebuild_after=1000, statements=None):
+        self.program = program
+        self.statements = statements
+        self.part = part
+        self.guard = guard
+        self.logger = logger
+        self.rebuild_after = rebuild_after
+
+        self.reset()
+
+    def reset(self):
+        if self.logger:
+            self.control = clingo.Control(logger=self.logger)
+        else:
+            self.control = clingo.Control()
+
+        add_program(self.control, self.program, self.statements)
+        self.control.ground([("base", [])])
+
+        self.inputs = {}
+        self.generation = 0
+        self.stale_parts = 0
+
+    def needs_rebuild(self):
+        return self.stale_parts > max(self.rebuild_after, 4 * len(self.inputs))
+
+    def update(self, inputs):
+        # inputs is {key: (key, arg, arg, ...)}, every arg a clingo-compatible int
+        if self.needs_rebuild():
+            self.reset()
+
+        for key in list(self.inputs.keys()):
+            if key not in inputs:
+                self.release(key)
+
+        parts = []
+        guards = []
+
+        for key, args in inputs.items():
+            current = self.inputs.get(key)
+
+            if current and current[0] == args:
+                continue
+
+            if current:
+                self.release(key)
+
+            self.generation += 1
+            numbers = [clingo.Number(arg) for arg in args]
+            generation = clingo.Number(self.generation)
+
+            parts.append((self.part, numbers + [generation]))
+            guard = clingo.Function(self.guard, [numbers[0], generation])
+            guards.append(guard)
+
+            self.inputs[key] = (args, guard)
+
+        if parts:
+            self.control.ground(parts)
+
+            for guard in guards:
+                self.control.assign_external(guard, True)
+
+        return len(parts)
+
+    def release(self, key):
+        _, guard = self.inputs.pop(key)
+        self.control.release_external(guard)
+        self.stale_parts += 1
+
+    def solve(self, on_model):
+        return self.control.solve(on_model=on_model)
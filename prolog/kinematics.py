@@ -0,0 +1,98 @@
+from collections.abc import MutableMapping
+
+from evennia.typeclasses.attributes import NAttributeProperty
+
+
+class KinematicState(MutableMapping):
+    """
+    A body's x, y, Fx, Fy, Vx, Vy and wasMoving held in slots. It behaves like
+    the newtonian_data dict it stands in for, and anything outside those keys
+    lands in `extra`. An optional watcher is called with the state whenever x
+    or y is written.
+    """
+
+    ORDER = ("x", "y", "Fx", "Fy", "Vx", "Vy", "wasMoving")
+    FIELDS = frozenset(ORDER)
+    POSITION = frozenset(["x", "y"])
+
+    __slots__ = ORDER + ("extra", "watcher")
+
+    def __init__(self, data=None):
+        self.extra = {}
+        self.watcher = None
+
+        if data:
+            for key, value in data.items():
+                self[key] = value
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            setattr(self, key, value)
+
+            if self.watcher and key in self.POSITION:
+                self.watcher(self)
+        else:
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELDS:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        else:
+            del self.extra[key]
+
+    def __iter__(self):
+        for key in self.ORDER:
+            if hasattr(self, key):
+                yield key
+
+        yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+class KinematicProperty(NAttributeProperty):
+    """
+    An NAttributeProperty whose value lives in a KinematicState on the object.
+    Reads and writes go to the state; the NAttribute only seeds it and takes
+    whole assignments. Neither is persistent, so like the plain NAttribute
+    before it, kinematic state is lost on reload.
+    """
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        state = getattr(instance, "_kinematics", None)
+
+        if state == None:
+            state = instance._kinematics = KinematicState(super().__get__(instance, owner))
+
+        return state
+
+    def __set__(self, instance, value):
+        previous = getattr(instance, "_kinematics", None)
+        state = instance._kinematics = KinematicState(value)
+        super().__set__(instance, dict(value))
+
+        if previous != None and previous.watcher:
+            state.watcher = previous.watcher
+            state.watcher(state)
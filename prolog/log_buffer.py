@@ -0,0 +1,87 @@
+from collections import deque
+
+
+class LogBuffer:
+    """
+    A fixed-capacity ring of log lines with severity levels. Once full, every
+    new line pushes out the oldest.
+
+    Lines are stored as (level, message, args) and only formatted with
+    message.format(*args) when read, so logging a whole model's symbols costs
+    nothing unless someone looks. Reading works like the list of strings it
+    replaces: iterate, index, slice, len(), `in` and == against a list.
+    """
+
+    LEVELS = ("debug", "info", "warning", "error")
+
+    def __init__(self, capacity=200):
+        self.entries = deque(maxlen=capacity)
+
+    @property
+    def capacity(self):
+        return self.entries.maxlen
+
+    def resize(self, capacity):
+        # Keeps the newest lines that still fit
+        if capacity != self.capacity:
+            self.entries = deque(self.entries, maxlen=capacity)
+
+    def log(self, level, message, *args):
+        self.entries.append((level, message, args))
+
+    def debug(self, message, *args):
+        self.log("debug", message, *args)
+
+    def info(self, message, *args):
+        self.log("info", message, *args)
+
+    def warning(self, message, *args):
+        self.log("warning", message, *args)
+
+    def error(self, message, *args):
+        self.log("error", message, *args)
+
+    def append(self, message):
+        # What list-style callers used to do
+        self.info(message)
+
+    def clear(self):
+        self.entries.clear()
+
+    @staticmethod
+    def format(entry):
+        _, message, args = entry
+        return message.format(*args) if args else message
+
+    def lines(self, level="debug"):
+        # Formatted lines at level or above, oldest first
+        minimum = self.LEVELS.index(level)
+        return [self.format(entry) for entry in list(self.entries) if self.LEVELS.index(entry[0]) >= minimum]
+
+    def __iter__(self):
+        return iter(self.lines())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.format(entry) for entry in list(self.entries)[index]]
+
+        return self.format(self.entries[index])
+
+    def __contains__(self, line):
+        return line in self.lines()
+
+    def __eq__(self, other):
+        if isinstance(other, LogBuffer):
+            return self.lines() == other.lines()
+
+        # Anything else, None included, compares without formatting a line
+        if not isinstance(other, list):
+            return NotImplemented
+
+        return self.lines() == other
+
+    def __repr__(self):
+        return repr(self.lines())
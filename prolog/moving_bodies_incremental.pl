@@ -0,0 +1,20 @@
+% Multi-shot version of moving_bodies_simulation.pl.
+%
+% The base part is grounded once per SpaceRoom. Every body is fed in through
+% its own body/9 program part, guarded by the live(B, G) external. When a body
+% changes, the previous generation's external is released and a new part is
+% grounded, so unchanged bodies are never re-grounded.
+%
+% One step ahead, same integer semantics as the reference program:
+%   V1 = V0 + F / M
+%   P1 = P0 + V1
+
+#program body(b, ix, iy, ivx, ivy, fx, fy, m, g).
+
+#external live(b, g).
+
+time_body_position(1, b, ix + ivx + fx / m, iy + ivy + fy / m, ivx + fx / m, ivy + fy / m) :- live(b, g).
+
+#program base.
+
+#show time_body_position/6.
@@ -0,0 +1,147 @@
+import clingo
+
+from prolog.incremental import IncrementalControl
+from prolog.decoder import ModelDecoder, numbers
+from prolog.program_cache import PROGRAM_CACHE
+from prolog.symbols import add_symbols
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+REFERENCE_PROGRAM = 'prolog/moving_bodies_simulation.pl'
+INCREMENTAL_PROGRAM = 'prolog/moving_bodies_incremental.pl'
+
+
+class PhysicsBackend:
+    """
+    Steps every body of a SpaceRoom one tick ahead.
+
+    Bodies come in as {key: (B, Ix, Iy, IVx, IVy, Fx, Fy, M)} and the result is
+    a list of (B, Px, Py, Vx, Vy), one per body. All values are ints, and every
+    backend must match the integer semantics of moving_bodies_simulation.pl.
+    """
+
+    name = None
+
+    def __init__(self, logger=None):
+        self.logger = logger
+
+    def step(self, bodies):
+        raise NotImplementedError
+
+    def control(self):
+        if self.logger:
+            return clingo.Control(logger=self.logger)
+        return clingo.Control()
+
+    @staticmethod
+    def decode(model):
+        return POSITION_DECODER.decode(model.symbols(shown=True))
+
+
+def decode_position(symbol, text):
+    # time_body_position(T, B, Px, Py, Vx, Vy) -> (B, Px, Py, Vx, Vy)
+    return tuple(numbers(symbol, text)[1:])
+
+
+POSITION_DECODER = ModelDecoder({"time_body_position": decode_position})
+
+
+class ClingoBackend(PhysicsBackend):
+    """
+    The reference implementation: grounds and solves moving_bodies_simulation.pl
+    from scratch with one body/9 fact per body.
+    """
+
+    name = "clingo"
+
+    def step(self, bodies):
+        ctl = self.control()
+        add_symbols(ctl, [("body", body + (0,)) for body in bodies.values()])
+        PROGRAM_CACHE.get(REFERENCE_PROGRAM).add_to(ctl)
+
+        ctl.ground([("base", [])])
+
+        positions = []
+        ctl.solve(on_model=lambda model: positions.extend(self.decode(model)))
+        ctl.cleanup()
+
+        return positions
+
+
+class IncrementalClingoBackend(PhysicsBackend):
+    """
+    Keeps one grounded Control alive and only re-grounds bodies that changed.
+    A new Control is built when the program file is edited.
+    """
+
+    name = "incremental"
+
+    def __init__(self, logger=None):
+        super().__init__(logger)
+        self.program = None
+        self.incremental_control = None
+
+    def step(self, bodies):
+        program = PROGRAM_CACHE.get(INCREMENTAL_PROGRAM)
+
+        if program is not self.program:
+            self.program = program
+            self.incremental_control = IncrementalControl(program.text, logger=self.logger, statements=program.statements)
+
+        self.incremental_control.update(bodies)
+
+        positions = []
+        self.incremental_control.solve(on_model=lambda model: positions.extend(self.decode(model)))
+
+        return positions
+
+
+class NumpyBackend(PhysicsBackend):
+    """
+    Semi-implicit Euler over struct-of-arrays: one contiguous int64 row each
+    for x, y, Vx, Vy, Fx, Fy and mass, all bodies stepped in one vectorized pass.
+    """
+
+    name = "numpy"
+
+    def step(self, bodies):
+        if len(bodies) == 0:
+            return []
+
+        # Transposing and copying gives a C-ordered array, one contiguous row per field
+        state = numpy.array(list(bodies.values()), dtype=numpy.int64).T.copy()
+        ids, x, y, vx, vy, fx, fy, m = state
+
+        vx += self.divide(fx, m)
+        vy += self.divide(fy, m)
+        x += vx
+        y += vy
+
+        return list(zip(ids.tolist(), x.tolist(), y.tolist(), vx.tolist(), vy.tolist()))
+
+    @staticmethod
+    def divide(numerator, denominator):
+        # clingo's integer division truncates towards zero, numpy's // floors
+        quotient = numpy.abs(numerator) // numpy.abs(denominator)
+        return quotient * numpy.sign(numerator) * numpy.sign(denominator)
+
+
+BACKENDS = {
+    ClingoBackend.name: ClingoBackend,
+    IncrementalClingoBackend.name: IncrementalClingoBackend,
+    NumpyBackend.name: NumpyBackend,
+}
+
+
+def make_backend(name, logger=None):
+    if name == NumpyBackend.name and numpy is None:
+        print("numpy is not installed, falling back to the incremental clingo physics backend.")
+        name = IncrementalClingoBackend.name
+
+    if name not in BACKENDS:
+        raise Exception(f"Unknown physics backend: {name}")
+
+    return BACKENDS[name](logger=logger)
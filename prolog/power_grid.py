@@ -0,0 +1,153 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class PowerGridSolver:
+    """
+    Computes one power tick for a vehicle's grid with numpy.
+
+    Subsystems come in Vehicle.power_grid() order. The grid is planned once into
+    layers by link depth from the core, then each tick runs generation, transfers
+    and consumption a whole layer at a time, which reproduces the sequential
+    Subsystem.at_tick walk exactly as long as every receiver has a single sender.
+    Transfers from one sender are handed out in priority order with a running
+    sum, so capacity caps and the sender's own stored energy are honored.
+
+    Grids it can't reproduce exactly (shared receivers, links back up the tree or
+    off the ship, overridden tick hooks) don't get a plan, and ticks where
+    something would falter and power off return False, so the caller falls back
+    to the sequential walk and its messages and hooks.
+    """
+
+    HOOKS = ("at_tick", "generate_energy", "transfer_energy", "consume_energy", "at_consume_energy")
+
+    def __init__(self, subsystems, base):
+        self.subsystems = list(subsystems)
+        self.priorities = self.read_priorities(self.subsystems)
+        self.layers = self.plan(base)
+
+    @staticmethod
+    def read_priorities(subsystems):
+        return tuple(subsystem.powerPriority for subsystem in subsystems)
+
+    def is_current(self, subsystems):
+        return subsystems == self.subsystems and self.read_priorities(subsystems) == self.priorities
+
+    def plan(self, base):
+        if numpy is None:
+            return None
+
+        for subsystem in self.subsystems:
+            for hook in self.HOOKS:
+                if getattr(type(subsystem), hook) is not getattr(base, hook):
+                    return None
+
+        index = {subsystem.id: i for i, subsystem in enumerate(self.subsystems)}
+        depth = [None] * len(self.subsystems)
+        layers = {}
+
+        for i, subsystem in enumerate(self.subsystems):
+            if depth[i] == None:
+                depth[i] = 0
+
+            nodes, senders, receivers = layers.setdefault(depth[i], ([], [], []))
+            nodes.append(i)
+
+            for receiver in subsystem.prioritized_links():
+                j = index.get(receiver.id)
+
+                # Only a tree walked in grid order matches the sequential tick
+                if j == None or j <= i or depth[j] != None:
+                    return None
+
+                depth[j] = depth[i] + 1
+                senders.append(i)
+                receivers.append(j)
+
+        plan = []
+
+        for level in sorted(layers):
+            nodes, senders, receivers = layers[level]
+            senders = numpy.array(senders, dtype=numpy.int64)
+
+            # Index of the first link of each link's sender, for per-sender running sums
+            first = numpy.zeros(len(senders), dtype=numpy.int64)
+            for k in range(1, len(senders)):
+                first[k] = first[k - 1] if senders[k] == senders[k - 1] else k
+
+            plan.append((numpy.array(nodes, dtype=numpy.int64), senders, numpy.array(receivers, dtype=numpy.int64), first))
+
+        return plan
+
+    def solve(self):
+        # Applies the tick and returns True, or returns False without writing anything
+        if self.layers == None:
+            return False
+
+        subsystems = self.subsystems
+        powered = numpy.array([subsystem.powered for subsystem in subsystems], dtype=bool)
+
+        def column(name):
+            return numpy.array([getattr(subsystem, name) for subsystem in subsystems], dtype=numpy.int64)
+
+        level = column("assignedEnergyLevel")
+        fuel = column("storedFuel")
+        stored = column("storedEnergy")
+        capacity = column("energyCapacity")
+        provided = column("energyProvidedPerTick")
+        burn = column("fuelConsumedPerTickPerLevel")
+        transfer = column("energyTransferredPerTick")
+        draw = column("energyConsumedPerTickPerLevel")
+
+        start_fuel = fuel.copy()
+        start_stored = stored.copy()
+
+        for nodes, senders, receivers, first in self.layers:
+            active = nodes[powered[nodes]]
+
+            # Generate
+            generators = active[provided[active] > 0]
+            fuel_draw = burn[generators] * level[generators]
+
+            if (fuel[generators] < fuel_draw).any():
+                return False
+
+            fuel[generators] -= fuel_draw
+            stored[generators] += numpy.minimum(provided[generators], capacity[generators] - stored[generators])
+
+            # Transfer, each sender's links in priority order
+            if len(senders):
+                live = powered[senders] & (transfer[senders] > 0)
+                want = numpy.minimum(transfer[senders], capacity[receivers] - stored[receivers])
+                available = stored[senders]
+
+                if (want[live] < 0).any() or (available[live] < 0).any():
+                    return False
+
+                want = numpy.where(live, want, 0)
+                total = numpy.cumsum(want)
+                through = total - numpy.concatenate(([0], total))[first]
+                amount = numpy.minimum(through, available) - numpy.minimum(through - want, available)
+
+                numpy.subtract.at(stored, senders, amount)
+                numpy.add.at(stored, receivers, amount)
+
+            # Consume
+            consumers = active[draw[active] > 0]
+            power_draw = draw[consumers] * level[consumers]
+            enough = stored[consumers] >= power_draw
+
+            if (~enough & (power_draw > 0)).any():
+                return False
+
+            stored[consumers[enough]] -= power_draw[enough]
+
+        for i in numpy.flatnonzero(fuel != start_fuel).tolist():
+            subsystems[i].storedFuel = int(fuel[i])
+
+        for i in numpy.flatnonzero(stored != start_stored).tolist():
+            subsystems[i].storedEnergy = int(stored[i])
+
+        return True
@@ -0,0 +1,214 @@
+from django.conf import settings
+import hashlib
+import os
+import threading
+import time
+import weakref
+
+try:
+    from clingo.ast import parse_string, ProgramBuilder, AST, ASTSequence, ASTType
+except ImportError:
+    parse_string = None
+    ProgramBuilder = None
+
+
+def parse_program(text, logger=None):
+    # Pre-parsed statements, or None when this clingo has no AST API
+    if parse_string == None:
+        return None
+
+    statements = []
+
+    if logger:
+        parse_string(text, statements.append, logger=logger)
+    else:
+        parse_string(text, statements.append)
+
+    return statements
+
+
+def add_program(ctl, text, statements=None):
+    # Skips clingo's parser when we already hold the statements
+    if statements != None:
+        with ProgramBuilder(ctl) as builder:
+            for statement in statements:
+                builder.add(statement)
+    else:
+        ctl.add("base", [], text)
+
+
+def reads_atom(node, name, arity):
+    # Whether an AST node has a name/arity atom anywhere under it
+    if isinstance(node, AST):
+        if node.ast_type == ASTType.SymbolicAtom:
+            symbol = node.symbol
+            return symbol.ast_type == ASTType.Function and symbol.name == name and len(symbol.arguments) == arity
+
+        return any(reads_atom(getattr(node, key), name, arity) for key in node.child_keys)
+
+    if isinstance(node, ASTSequence):
+        return any(reads_atom(item, name, arity) for item in node)
+
+    return False
+
+
+def reads_predicate(text, statements, name, arity):
+    # Whether any statement mentions name/arity: rule bodies, head conditions,
+    # choice elements and #show terms alike. Without the AST API, any mention of name counts.
+    if statements == None:
+        return name in text
+
+    return any(reads_atom(statement, name, arity) for statement in statements)
+
+
+class CompiledProgram:
+    # Program text parsed once, to be added to any number of Controls
+    def __init__(self, text, logger=None):
+        self.text = text
+        self.statements = parse_program(text, logger)
+
+    def add_to(self, ctl):
+        add_program(ctl, self.text, self.statements)
+
+    @property
+    def digest(self):
+        # sha256 of the text, for content addressing and solve fingerprints
+        digest = getattr(self, "_digest", None)
+
+        if digest == None:
+            digest = self._digest = hashlib.sha256(self.text.encode()).hexdigest()
+
+        return digest
+
+    @property
+    def reads_time(self):
+        # Whether the program reads currentTime/1, which changes every tick
+        reads = getattr(self, "_reads_time", None)
+
+        if reads == None:
+            reads = self._reads_time = reads_predicate(self.text, self.statements, "currentTime", 1)
+
+        return reads
+
+
+class CompiledProgramSet(CompiledProgram):
+    # Several CompiledPrograms grounded together, each keeping its own parse
+    def __init__(self, programs):
+        self.programs = list(programs)
+        self.statements = None
+
+    @property
+    def text(self):
+        # Joined on demand, the members already hold the text once in the store
+        return "\n".join(program.text for program in self.programs)
+
+    @property
+    def digest(self):
+        # From the members' digests, so the text is never joined just to hash it
+        digest = getattr(self, "_digest", None)
+
+        if digest == None:
+            digest = self._digest = hashlib.sha256(" ".join(program.digest for program in self.programs).encode()).hexdigest()
+
+        return digest
+
+    @property
+    def reads_time(self):
+        return any(program.reads_time for program in self.programs)
+
+    def add_to(self, ctl):
+        for program in self.programs:
+            program.add_to(ctl)
+
+
+class CachedProgram(CompiledProgram):
+    def __init__(self, path, mtime, text):
+        super().__init__(text)
+        self.path = path
+        self.mtime = mtime
+        self.checked_at = time.monotonic()
+
+
+class ProgramCache:
+    """
+    Program files keyed by path and mtime, with their parsed statements.
+
+    The file is only stat'ed again once check_interval seconds have passed, so
+    most ticks never touch the filesystem, while builders editing a .pl file
+    still see the new rules within check_interval seconds.
+    """
+
+    def __init__(self, check_interval=5.0):
+        self.check_interval = check_interval
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        entry = self.entries.get(path)
+
+        if entry and time.monotonic() - entry.checked_at < self.check_interval:
+            return entry
+
+        with self.lock:
+            mtime = os.stat(path).st_mtime_ns
+            entry = self.entries.get(path)
+
+            if entry and entry.mtime == mtime:
+                entry.checked_at = time.monotonic()
+                return entry
+
+            with open(path, 'r') as file:
+                entry = CachedProgram(path, mtime, file.read())
+
+            self.entries[path] = entry
+            return entry
+
+    def text(self, path):
+        return self.get(path).text
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+
+
+class ProgramStore:
+    """
+    CompiledPrograms by the sha256 of their text, so a program run by hundreds
+    of cores is parsed and held in memory once. Entries are weakly held and go
+    away once no core's compiled program uses them any more.
+
+    Text that fails to parse raises and is never stored, every core trying it
+    gets the error through its own logger.
+    """
+
+    def __init__(self):
+        self.entries = weakref.WeakValueDictionary()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text):
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, text, logger=None):
+        key = self.key(text)
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry != None:
+                self.hits += 1
+                return entry
+
+            self.misses += 1
+            entry = self.entries[key] = CompiledProgram(text, logger)
+            entry._digest = key
+            return entry
+
+    def __len__(self):
+        return len(self.entries)
+
+
+PROGRAM_STORE = ProgramStore()
+
+PROGRAM_CACHE = ProgramCache(check_interval=getattr(settings, "SIMULATION_PROGRAM_CHECK_INTERVAL", 5.0))
@@ -0,0 +1,83 @@
+from twisted.internet import reactor
+import itertools
+import threading
+
+
+class ReactorMailbox:
+    """
+    Simulation results waiting to be applied on the reactor thread.
+
+    Simulation threads post() callables as they finish, and the scheduler
+    flush()es once per tick, which hands everything posted so far to the
+    reactor in a single callFromThread. Results posted under a key replace
+    any still waiting under the same key, moving to the back of the batch, so
+    a late tick can't apply stale state after newer state. Without a running
+    reactor posts are applied straight away.
+
+    A result that raises is handed to the on_error it was posted with, so the
+    simulator that produced it can fail the way a failed solve would.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.sequence = itertools.count()
+        self.deliveries = 0
+        self.delivered = 0
+        self.coalesced = 0
+
+    def post(self, function, *args, key=None, on_error=None, **kwargs):
+        if not reactor.running:
+            self.apply(function, args, kwargs, on_error)
+            return
+
+        with self.lock:
+            if key == None:
+                key = (None, next(self.sequence))
+            elif key in self.pending:
+                del self.pending[key]
+                self.coalesced += 1
+
+            self.pending[key] = (function, args, kwargs, on_error)
+
+    def flush(self, timeout=None):
+        # With a timeout, wait up to that long for the reactor to apply the batch
+        with self.lock:
+            batch = list(self.pending.values())
+            self.pending = {}
+
+        if batch:
+            done = threading.Event()
+            reactor.callFromThread(self.deliver, batch, done)
+
+            if timeout != None:
+                done.wait(timeout)
+
+        return len(batch)
+
+    def deliver(self, batch, done=None):
+        # On the reactor thread. One bad result mustn't keep the rest of the tick from applying.
+        self.deliveries += 1
+
+        try:
+            for function, args, kwargs, on_error in batch:
+                self.apply(function, args, kwargs, on_error)
+                self.delivered += 1
+        finally:
+            if done != None:
+                done.set()
+
+    def apply(self, function, args, kwargs, on_error):
+        try:
+            function(*args, **kwargs)
+        except Exception as e:
+            if on_error == None:
+                print(f"Could not apply simulation result {function}: {e}")
+            else:
+                on_error(e)
+
+    def __len__(self):
+        return len(self.pending)
+
+
+MAILBOX = ReactorMailbox()
@@ -0,0 +1,276 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.conf import settings
+import threading
+import time
+
+from prolog.reactor import MAILBOX
+
+
+class SimulationScheduler:
+    """
+    One shared clock for every Simulatable in the game.
+
+    Each tick, every registered simulator that is not still busy with its
+    previous tick is handed to a bounded worker pool. A simulator whose last
+    run has not finished is skipped for this tick (backpressure), as is any
+    work beyond max_queue, so a slow tick can never pile up more work.
+    Each tick starts handing out work where the last one left off, so a
+    max_queue smaller than the number of simulators can't starve any of them.
+
+    Ticks run on a fixed timestep and in PHASES order: every simulator's
+    simulation_phase is waited on before the next phase starts, so power grids
+    settle before physics moves bodies and core programs see both. Each
+    phase's results are applied on the reactor before the next phase starts.
+    All the phases of a tick share one deadline, a tick interval after it
+    started. A clock that falls behind runs the ticks it missed
+    back to back, up to max_catch_up of them, and drops the rest.
+
+    Time is read from clock, time.monotonic unless a test hands in its own.
+    """
+
+    PHASES = ("power", "physics", "programs")
+
+    def __init__(self, tick_interval=1.0, max_workers=4, max_queue=None, max_catch_up=5, clock=time.monotonic):
+        self.tick_interval = tick_interval
+        self.clock = clock
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_catch_up = max_catch_up
+
+        self.lock = threading.Lock()
+        self.simulators = {}
+        self.in_flight = set()
+        self.cursor = 0
+        self.executor = None
+        self.clock_thread = None
+        self.clock_generation = 0
+        self.running = False
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.tick_count = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.dropped = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.last_tick_latency = 0.0
+        self.max_tick_latency = 0.0
+        self.pending = {}
+
+    def register(self, simulator, run_now=True):
+        with self.lock:
+            self.simulators[id(simulator)] = simulator
+
+        self.start()
+
+        # Run once straight away instead of waiting for the next tick
+        if run_now:
+            self.submit(simulator, None)
+
+    def unregister(self, simulator):
+        with self.lock:
+            removed = self.simulators.pop(id(simulator), None)
+
+        # Tell the simulator it's off the clock, whoever took it off
+        if removed != None and hasattr(simulator, "at_simulation_stop"):
+            simulator.at_simulation_stop()
+
+    def is_registered(self, simulator):
+        return id(simulator) in self.simulators
+
+    def queue_depth(self):
+        return len(self.in_flight)
+
+    def stats(self):
+        return {
+            "registered": len(self.simulators),
+            "ticks": self.tick_count,
+            "queue_depth": self.queue_depth(),
+            "last_tick_latency": self.last_tick_latency,
+            "max_tick_latency": self.max_tick_latency,
+            "skipped": self.skipped,
+            "overruns": self.overruns,
+            "overrun_rate": self.overruns / self.tick_count if self.tick_count else 0.0,
+            "dropped": self.dropped,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "mean_lag": self.total_lag / self.tick_count if self.tick_count else 0.0,
+            "workers": self.max_workers,
+        }
+
+    def phase_of(self, simulator):
+        # Simulators without a known phase run last
+        phase = getattr(simulator, "simulation_phase", None)
+        return self.PHASES.index(phase) if phase in self.PHASES else len(self.PHASES)
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+
+            self.running = True
+            self.clock_generation += 1
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="simulation")
+            self.clock_thread = threading.Thread(target=self.clock_loop, args=(self.clock_generation,), name="simulation-clock")
+            self.clock_thread.daemon = True  # exits with the server
+            self.clock_thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            executor = self.executor
+            self.executor = None
+
+        if executor:
+            executor.shutdown(wait=False)
+
+    def clock_loop(self, generation):
+        next_tick = self.clock()
+
+        # A stop() and start() while we slept hands the clock to a new thread
+        while self.running and self.clock_generation == generation:
+            next_tick, delay = self.step(next_tick)
+
+            if delay > 0:
+                time.sleep(delay)
+
+    def step(self, next_tick):
+        # Runs the tick due at next_tick. Returns when the following tick is due
+        # and how long until then, 0 if it's due already.
+        now = self.clock()
+        behind = int((now - next_tick) / self.tick_interval)
+
+        if behind > self.max_catch_up:
+            # Too far behind to catch up, give up on the oldest ticks
+            self.dropped += behind - self.max_catch_up
+            next_tick += (behind - self.max_catch_up) * self.tick_interval
+
+        self.record_lag(max(now - next_tick, 0.0))
+        self.tick()
+
+        next_tick += self.tick_interval
+        now = self.clock()
+
+        if now > next_tick:
+            # The next tick is already due, run it straight away
+            self.overruns += 1
+            return next_tick, 0.0
+
+        return next_tick, next_tick - now
+
+    def record_lag(self, lag):
+        # How late a tick started against the fixed timestep
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.total_lag += lag
+
+    def tick(self):
+        self.tick_count += 1
+        tick = self.tick_count
+
+        with self.lock:
+            simulators = list(self.simulators.values())
+            cursor = self.cursor % len(simulators) if simulators else 0
+            simulators = simulators[cursor:] + simulators[:cursor]
+            # One outstanding slot for the submission itself, so the tick can't
+            # complete before every simulator has been handed out
+            self.pending[tick] = [self.clock(), 1]
+
+        # sorted() is stable, so each phase keeps the round robin order
+        submitted = 0
+        deadline = self.clock() + self.tick_interval
+        for phase in sorted(set(map(self.phase_of, simulators))):
+            futures = []
+
+            for simulator in simulators:
+                if self.phase_of(simulator) == phase:
+                    future = self.submit(simulator, tick)
+
+                    if future != None:
+                        futures.append(future)
+
+            submitted += len(futures)
+            wait(futures, timeout=max(deadline - self.clock(), 0))
+
+            # The phase's results reach the reactor in one callback and are applied
+            # before the next phase, or the next tick's physics, reads them
+            MAILBOX.flush(timeout=max(deadline - self.clock(), 0))
+
+        self.cursor = cursor + submitted
+        self.finish(tick, 1)
+
+    def submit(self, simulator, tick):
+        # The Future running simulator, or None if it was skipped
+        with self.lock:
+            if self.executor == None:
+                return None
+
+            if id(simulator) in self.in_flight:
+                self.skipped += 1
+                return None
+
+            if self.max_queue and len(self.in_flight) >= self.max_queue:
+                self.skipped += 1
+                return None
+
+            self.in_flight.add(id(simulator))
+
+            if tick in self.pending:
+                self.pending[tick][1] += 1
+
+            executor = self.executor
+
+        try:
+            return executor.submit(self.run, simulator, tick)
+        except RuntimeError:
+            # Pool shut down underneath us
+            with self.lock:
+                self.in_flight.discard(id(simulator))
+            self.finish(tick, 1)
+            return None
+
+    def run(self, simulator, tick):
+        keep_running = False
+        completed = False
+
+        try:
+            keep_running = simulator.run_simulation()
+            completed = True
+        finally:
+            with self.lock:
+                self.in_flight.discard(id(simulator))
+
+            if not keep_running:
+                self.unregister(simulator)
+
+                # It may have been tracked again while this run was finishing
+                if completed and simulator.wants_simulation():
+                    self.register(simulator)
+
+            self.finish(tick, 1)
+
+    def finish(self, tick, completed):
+        with self.lock:
+            if tick not in self.pending:
+                return
+
+            started, outstanding = self.pending[tick]
+            outstanding -= completed
+            self.pending[tick][1] = outstanding
+
+            if outstanding <= 0:
+                # Latency is measured from the tick firing to its last simulation finishing
+                del self.pending[tick]
+                self.last_tick_latency = self.clock() - started
+                self.max_tick_latency = max(self.max_tick_latency, self.last_tick_latency)
+
+
+SCHEDULER = SimulationScheduler(
+    tick_interval=getattr(settings, "SIMULATION_TICK_INTERVAL", 1.0),
+    max_workers=getattr(settings, "SIMULATION_WORKERS", 4),
+    max_queue=getattr(settings, "SIMULATION_MAX_QUEUE", None),
+    max_catch_up=getattr(settings, "SIMULATION_MAX_CATCH_UP", 5),
+)
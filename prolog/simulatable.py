@@ -1,96 +1,196 @@
 from evennia import TICKER_HANDLER as ticker
 import evennia
 import clingo
-import threading
 import time
 import traceback
 
+from django.conf import settings
+
+from prolog.scheduler import SCHEDULER
+from prolog.solver_pool import SolverPool
+from prolog.symbols import add_symbols, SymbolModel
+from prolog.program_cache import CompiledProgram
+from prolog.reactor import MAILBOX
+from prolog.budget import SolveBudget
+
+SOLVER_POOL = SolverPool(
+    processes=getattr(settings, "SIMULATION_SOLVER_PROCESSES", None),
+    start_method=getattr(settings, "SIMULATION_SOLVER_START_METHOD", "spawn"),
+)
+
 class Simulatable:
-    to_simulate = {}
-    simulation_thread = None    
     simulation_print = print
     failure = False
     last_error = ""
 
+    # Ground and solve in SOLVER_POOL instead of this process, results come back through update()
+    solve_in_process = getattr(settings, "SIMULATION_SOLVE_IN_PROCESS", False)
+
+    # Wall-clock seconds for one ground and solve, and most atoms the ground
+    # program may have. Overruns fail the simulator like any other error.
+    solve_timeout = getattr(settings, "SIMULATION_SOLVE_TIMEOUT", None)
+    max_ground_atoms = getattr(settings, "SIMULATION_MAX_GROUND_ATOMS", None)
+
+    # A SolveMemo to reuse models from identical inputs, see memo_key()
+    solve_memo = None
+
+    # Every simulator owns its registry: a room only sees its own bodies and a
+    # core only itself. Created lazily since typeclasses can't take an __init__.
+    @property
+    def to_simulate(self):
+        registry = getattr(self, "_to_simulate", None)
+
+        if registry == None:
+            registry = self._to_simulate = {}
+
+        return registry
+
+    @to_simulate.setter
+    def to_simulate(self, registry):
+        self._to_simulate = registry
+
+    def simulation_scope(self):
+        # The objects whose facts feed this simulator's solve
+        return list(self.to_simulate.values())
+
     def program(self):
         pass
 
+    def simulation_program(self):
+        # The program text (or a CompiledProgram) to ground; facts from the scope are added separately
+        return self.program()
+
+    def simulation_facts(self):
+        # (symbols, text facts) for everything in scope. Objects whose to_symbols()
+        # returns None (or that lack one) fall back to their to_fact() string.
+        symbols = []
+        facts = []
+
+        for item in self.simulation_scope():
+            to_symbols = getattr(item, "to_symbols", None)
+            item_symbols = to_symbols() if to_symbols else None
+
+            if item_symbols == None:
+                facts.append(item.to_fact())
+            else:
+                symbols.extend(item_symbols)
+
+        return symbols, facts
+
     def control_logger_callback(self, code, str):
         pass
 
+    def solve_budget(self):
+        return SolveBudget(self.solve_timeout, self.max_ground_atoms)
+
     def simulate(self):
         if self.failure:
             return False
 
-        if self.program() != None:
+        program = self.simulation_program()
+
+        if program != None:
             #print(f"Simulating: {self}")
-            # create controller
-            ctl = clingo.Control(logger=self.control_logger_callback)
+            symbols, facts = self.simulation_facts()
+
+            # Same inputs as a solve already in the memo, skip clingo altogether
+            key = self.memo_key(program, symbols, facts) if self.solve_memo != None else None
+            models = self.solve_memo.get(key) if key != None else None
 
-            # Add program
-            ctl.add("base", [], self.program())
+            if models == None:
+                models = self.solve_models(program, symbols, facts)
 
-            # Add all to_simulate[] terms
-            for key,item in self.to_simulate.items():
-                fact = item.to_fact()
-                ctl.add("base", [], fact)
+                if key != None:
+                    self.solve_memo.put(key, models)
 
-            # Ground
-            ctl.ground([("base", [])])
+            for model in models:
+                MAILBOX.post(self.update, model, on_error=self.record_failure)
 
-            # Solve
-            ctl.solve(on_model=self.update)
-            ctl.cleanup()
+    def memo_key(self, program, symbols, facts):
+        # Fingerprint of a solve's inputs for solve_memo, None to always solve
+        return None
+
+    def solve_models(self, program, symbols, facts):
+        # Ground and solve, returning every model's shown symbols
+        budget = self.solve_budget()
+
+        if self.solve_in_process:
+            text = program.text if isinstance(program, CompiledProgram) else program
+            return self.simulate_in_process(text, symbols, facts, budget)
+
+        # create controller
+        ctl = clingo.Control(logger=self.control_logger_callback)
+
+        # Structured facts go straight into the ground program, before the text
+        add_symbols(ctl, symbols)
+
+        # Add program
+        if isinstance(program, CompiledProgram):
+            program.add_to(ctl)
+        else:
+            ctl.add("base", [], program)
+
+        # Add the string facts of anything in scope without to_symbols()
+        for fact in facts:
+            ctl.add("base", [], fact)
+
+        # Ground
+        budget.ground(ctl)
+
+        # Solve. A Model only lives as long as the callback, so copy its symbols for the reactor
+        models = []
+        budget.solve(ctl, lambda model: models.append(SymbolModel(model.symbols(shown=True))))
+        ctl.cleanup()
+
+        return tuple(models)
+
+    def simulate_in_process(self, program, symbols, facts, budget=None):
+        return tuple(SOLVER_POOL.solve(program, facts, logger=self.control_logger_callback, symbols=symbols, budget=budget))
 
     def update(self, model):
-        # Catch solved model, interpret terms into updates for tracked objects
+        # Catch solved model, interpret terms into updates for tracked objects.
+        # Runs on the reactor thread, batched with the rest of the tick's results.
         pass
 
     def clear_failure(self):
         self.failure = False
         self.last_error = ""
 
-    def track(self, instance):
-        self.to_simulate[instance.id] = instance
-
-        if self.simulation_thread != None and not self.simulation_thread.is_alive():
-            self.simulation_thread = None
+    def run_simulation(self):
+        # One tick, called by the scheduler. Returns False once there's nothing left to run.
+        if self.failure:
+            return False
 
-        if self.simulation_thread == None and not self.failure:
-            def simulation_loop():
-                while not self.failure:
-                    try:
-                        start_time = time.time()
+        try:
+            self.simulate()
+        except Exception as e:
+            self.record_failure(e)
+            return False
 
-                        self.simulate()
+        return self.wants_simulation()
 
-                        elapsed_time = time.time() - start_time
-                        sleep_time = max(1 - elapsed_time, 0)
+    def record_failure(self, e):
+        # A failed solve, or a result that failed to apply on the reactor. The
+        # scheduler drops the simulator on its next run.
+        self.failure = True
 
-                        time.sleep(sleep_time)
+        error_message = str(e)
+        # Capture the stack trace
+        self.last_error = f"|rProgram failure. Clear error to continue.\n|rERROR MSG: {error_message}\n\n|yProgram follows:\n\n==========\n|y{self.program()}"
 
-                        if len(list(self.to_simulate.items())) == 0:
-                            return True
-                    except Exception as e:
-                        error_message = str(e)
-                        # Capture the stack trace
-                        self.last_error = f"|rProgram failure. Clear error to continue.\n|rERROR MSG: {error_message}\n\n|yProgram follows:\n\n==========\n|y{self.program()}"
+        #traceback.print_exc()
 
-                        #print("!!!!!!!!!!!!!!!!!!!!!!!")
-                        #print(self.last_error)
-                        #print("^^^^^^^^^^^^^^^^^^^^^^^")
-                        #traceback.print_exc()
-                        #print("!!!!!!!!!!!!!!!!!!!!!!!")
+    def wants_simulation(self):
+        return not self.failure and len(self.to_simulate) > 0
 
+    def is_simulating(self):
+        return SCHEDULER.is_registered(self)
 
-                        self.failure = True
-                        self.simulation_thread = None
-                        return False
+    def track(self, instance):
+        self.to_simulate[instance.id] = instance
 
-            self.simulation_thread = threading.Thread(target=simulation_loop)
-            self.simulation_thread.setDaemon(True)  # Set as a daemon so it exits when main program exits
-            self.simulation_thread.start()
-            
+        if not self.failure and not self.is_simulating():
+            SCHEDULER.register(self)
 
     def ignore(self, instance):
         if instance.id in self.to_simulate:
@@ -98,3 +198,7 @@ class Simulatable:
 
     def to_fact(self):
         raise Exception("Must be overriden in the base class")
+
+    def to_symbols(self):
+        # Facts as (name, args) tuples or clingo Symbols. None means use to_fact().
+        return None
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+from django.conf import settings
+import hashlib
+import threading
+
+
+def fingerprint(*parts):
+    # Stable digest of a simulator's solve inputs: strings, tuples and clingo Symbols
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+class SolveMemo:
+    """
+    The models a solve produced, by the fingerprint of everything that went
+    into it. Simulators whose inputs match, on a later tick or on another core
+    entirely, get the same models back without touching clingo. The least
+    recently used entries are dropped past capacity.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        # The models stored under key, or None
+        with self.lock:
+            models = self.entries.get(key)
+
+            if models == None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return models
+
+    def put(self, key, models):
+        with self.lock:
+            self.entries[key] = models
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+SOLVE_MEMO = SolveMemo(capacity=getattr(settings, "SIMULATION_SOLVE_MEMO_SIZE", 1024))
@@ -0,0 +1,91 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+
+import clingo
+
+from prolog.symbols import symbol_to_tuple, tuple_to_symbol, add_symbols, SymbolModel
+from prolog.budget import SolveBudget, SolveBudgetExceeded
+
+
+def solve_program(program, facts, symbols=(), budget=(None, None)):
+    """
+    Runs in a solver process: grounds and solves program plus facts (text) and
+    symbols (plain tuples), and returns every model's shown symbols as plain
+    tuples alongside whatever clingo logged. Nothing clingo-specific crosses
+    the process boundary. budget is the (timeout, max_atoms) of a SolveBudget,
+    an overrun comes back as the SolveBudgetExceeded itself.
+    """
+    messages = []
+
+    def logger(code, message):
+        messages.append((str(code), message))
+
+    try:
+        ctl = clingo.Control(logger=logger)
+        add_symbols(ctl, symbols)
+        ctl.add("base", [], program)
+
+        for fact in facts:
+            ctl.add("base", [], fact)
+
+        limits = SolveBudget(*budget)
+        limits.ground(ctl)
+
+        models = []
+        limits.solve(ctl, lambda model: models.append([symbol_to_tuple(symbol) for symbol in model.symbols(shown=True)]))
+        ctl.cleanup()
+    except SolveBudgetExceeded as e:
+        return [], messages, e
+    except RuntimeError as e:
+        return [], messages, str(e)
+
+    return models, messages, None
+
+
+class SolverPool:
+    """
+    A lazily started pool of solver processes, so clingo grounding and solving
+    run on every CPU instead of competing for the server process' GIL.
+    """
+
+    def __init__(self, processes=None, start_method="spawn"):
+        self.processes = processes
+        self.start_method = start_method
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.executor == None:
+                context = multiprocessing.get_context(self.start_method)
+                self.executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+
+            return self.executor
+
+    def stop(self):
+        with self.lock:
+            executor = self.executor
+            self.executor = None
+
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def solve(self, program, facts, logger=None, symbols=(), budget=None):
+        # Blocks the calling (scheduler worker) thread, not the GIL, until the solve is back
+        symbols = [symbol_to_tuple(symbol) if isinstance(symbol, clingo.Symbol) else symbol for symbol in symbols]
+        limits = (budget.timeout, budget.max_atoms) if budget != None else (None, None)
+        # The budget is kept in the solver process, time spent queued for one doesn't count
+        models, messages, error = self.start().submit(solve_program, program, list(facts), symbols, limits).result()
+
+        if logger:
+            for code, message in messages:
+                logger(code, message)
+
+        if isinstance(error, SolveBudgetExceeded):
+            raise error
+
+        if error:
+            raise RuntimeError(error)
+
+        return [SymbolModel([tuple_to_symbol(value) for value in model]) for model in models]
@@ -0,0 +1,82 @@
+class SpatialGrid:
+    """
+    A uniform grid spatial hash over integer positions. Objects are bucketed
+    by (x // cell_size, y // cell_size), so box and radius queries only visit
+    the cells they overlap and exact-position lookups a single cell.
+    """
+
+    def __init__(self, cell_size=16):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, obj):
+        return obj.id in self.positions
+
+    def cell_of(self, x, y):
+        return (x // self.cell_size, y // self.cell_size)
+
+    def place(self, obj, x, y):
+        current = self.positions.get(obj.id)
+
+        if current != None:
+            if current[0] == x and current[1] == y:
+                return
+
+            self.unbucket(obj.id, current[2])
+
+        cell = self.cell_of(x, y)
+        self.positions[obj.id] = (x, y, cell, obj)
+        self.cells.setdefault(cell, {})[obj.id] = obj
+
+    def remove(self, obj):
+        current = self.positions.pop(obj.id, None)
+
+        if current != None:
+            self.unbucket(obj.id, current[2])
+
+    def unbucket(self, key, cell):
+        bucket = self.cells[cell]
+        del bucket[key]
+
+        if len(bucket) == 0:
+            del self.cells[cell]
+
+    def clear(self):
+        self.cells = {}
+        self.positions = {}
+
+    def at(self, x, y):
+        bucket = self.cells.get(self.cell_of(x, y), {})
+        return self.sorted([obj for key, obj in bucket.items() if self.positions[key][0] == x and self.positions[key][1] == y])
+
+    def box(self, min_x, min_y, max_x, max_y):
+        min_cx, min_cy = self.cell_of(min_x, min_y)
+        max_cx, max_cy = self.cell_of(max_x, max_y)
+
+        # A box wider than the populated grid is cheaper to answer from the occupied cells
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(self.cells):
+            cells = [cell for cell in self.cells if min_cx <= cell[0] <= max_cx and min_cy <= cell[1] <= max_cy]
+        else:
+            cells = [(cx, cy) for cx in range(min_cx, max_cx + 1) for cy in range(min_cy, max_cy + 1)]
+
+        found = []
+        for cell in cells:
+            for key, obj in self.cells.get(cell, {}).items():
+                x, y = self.positions[key][0], self.positions[key][1]
+
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    found.append(obj)
+
+        return self.sorted(found)
+
+    def near(self, x, y, radius):
+        # Square (Chebyshev) radius, like SpaceRoom.item_nearby
+        return self.box(x - radius, y - radius, x + radius, y + radius)
+
+    def sorted(self, objects):
+        # Same order a scan over room.contents gives
+        return sorted(objects, key=lambda obj: obj.id)
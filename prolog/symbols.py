@@ -0,0 +1,83 @@
+import clingo
+
+# Plain python forms of clingo Symbols, so they can be pickled across processes:
+#   Number -> int
+#   String -> str
+#   Function -> (name, (args...)) or (name, (args...), False) when negated
+#   Infimum/Supremum -> ("#inf", ()) / ("#sup", ())
+
+INFIMUM = ("#inf", ())
+SUPREMUM = ("#sup", ())
+
+
+def symbol_to_tuple(symbol):
+    if symbol.type == clingo.SymbolType.Number:
+        return symbol.number
+
+    if symbol.type == clingo.SymbolType.String:
+        return symbol.string
+
+    if symbol.type == clingo.SymbolType.Infimum:
+        return INFIMUM
+
+    if symbol.type == clingo.SymbolType.Supremum:
+        return SUPREMUM
+
+    arguments = tuple(symbol_to_tuple(argument) for argument in symbol.arguments)
+
+    if symbol.negative:
+        return (symbol.name, arguments, False)
+
+    return (symbol.name, arguments)
+
+
+def tuple_to_symbol(value):
+    if isinstance(value, clingo.Symbol):
+        return value
+
+    if isinstance(value, bool):
+        raise TypeError(f"Cannot turn {value!r} into a clingo symbol")
+
+    if isinstance(value, int):
+        return clingo.Number(value)
+
+    if isinstance(value, str):
+        return clingo.String(value)
+
+    if value == INFIMUM:
+        return clingo.Infimum
+
+    if value == SUPREMUM:
+        return clingo.Supremum
+
+    name, arguments = value[0], value[1]
+    positive = value[2] if len(value) > 2 else True
+
+    return clingo.Function(name, [tuple_to_symbol(argument) for argument in arguments], positive)
+
+
+def constant(name):
+    # A bare ASP constant such as `off` or `engine`, as opposed to a "string"
+    return (name, ())
+
+
+def add_symbols(ctl, symbols):
+    # Adds each symbol as a fact straight into the ground program, nothing to
+    # format or parse. Call it before the program text is added, otherwise
+    # clingo reports the program's #show signatures as having no atoms.
+    with ctl.backend() as backend:
+        for symbol in symbols:
+            backend.add_rule([backend.add_atom(tuple_to_symbol(symbol))])
+
+
+class SymbolModel:
+    """
+    Stands in for a clingo.Model when the solve happened somewhere else, so
+    update(model) implementations can stay as they are.
+    """
+
+    def __init__(self, symbols):
+        self.shown = symbols
+
+    def symbols(self, shown=True, **kwargs):
+        return self.shown
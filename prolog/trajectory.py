@@ -0,0 +1,82 @@
+def truncated_divide(numerator, denominator):
+    # clingo's integer division truncates towards zero, python's // floors
+    quotient = abs(numerator) // abs(denominator)
+    return quotient if (numerator < 0) == (denominator < 0) else -quotient
+
+
+class Trajectory:
+    """
+    Where a body will be while its force stays the same, in closed form.
+
+    Anchored at a body tuple (B, Ix, Iy, IVx, IVy, Fx, Fy, M) seen at a room's
+    physics step. With a constant acceleration A = Fx / M every step adds A to
+    the velocity and then the velocity to the position, so n steps on
+
+        V = IV + n * A
+        P = I + n * IV + A * n * (n + 1) / 2
+
+    which matches moving_bodies_simulation.pl stepped n times, integers and all.
+    """
+
+    __slots__ = ("step", "x", "y", "vx", "vy", "fx", "fy", "mass", "ax", "ay")
+
+    def __init__(self, step, body):
+        _, self.x, self.y, self.vx, self.vy, self.fx, self.fy, self.mass = body
+        self.step = step
+        self.ax = truncated_divide(self.fx, self.mass)
+        self.ay = truncated_divide(self.fy, self.mass)
+
+    def state(self, step):
+        # (Px, Py, Vx, Vy) at a physics step at or after the anchor
+        n = step - self.step
+        travelled = n * (n + 1) // 2
+
+        return (
+            self.x + n * self.vx + self.ax * travelled,
+            self.y + n * self.vy + self.ay * travelled,
+            self.vx + n * self.ax,
+            self.vy + n * self.ay,
+        )
+
+    def matches(self, step, body):
+        # Still valid if the force and mass are the same and nothing moved the body off course
+        _, x, y, vx, vy, fx, fy, mass = body
+
+        if (fx, fy, mass) != (self.fx, self.fy, self.mass) or step < self.step:
+            return False
+
+        return self.state(step) == (x, y, vx, vy)
+
+
+class TrajectoryCache:
+    """
+    One Trajectory per body id. A lookup re-anchors the body only when its
+    force or mass changed, or its state no longer lies on the cached path
+    (docking, teleports, builders editing newtonian_data).
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, step, body):
+        entry = self.entries.get(body[0])
+
+        if entry != None and entry.matches(step, body):
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = self.entries[body[0]] = Trajectory(step, body)
+        return entry
+
+    def predict(self, step, body, ahead):
+        # (Px, Py, Vx, Vy) `ahead` physics steps after step
+        return self.get(step, body).state(step + ahead)
+
+    def discard(self, id):
+        self.entries.pop(id, None)
+
+    def clear(self):
+        self.entries = {}
@@ -30,7 +30,10 @@ def at_server_start():
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    from evennia import TICKER_HANDLER as tickerhandler
+    from prolog.checkpoint import CHECKPOINT_INTERVAL, flush_checkpoints
+
+    tickerhandler.add(CHECKPOINT_INTERVAL, flush_checkpoints, idstring="checkpoints", persistent=False)
 
 
 def at_server_stop():
@@ -38,7 +41,13 @@ def at_server_stop():
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    from prolog.scheduler import SCHEDULER
+    from prolog.simulatable import SOLVER_POOL
+    from prolog.checkpoint import flush_checkpoints
+
+    SCHEDULER.stop()
+    SOLVER_POOL.stop()
+    flush_checkpoints()
 
 
 def at_server_reload_start():
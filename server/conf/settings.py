@@ -35,6 +35,41 @@ from evennia.settings_default import *
 SERVERNAME = "signal"
 
 
+######################################################################
+# Simulation
+######################################################################
+
+# Seconds between ticks of the shared simulation clock.
+SIMULATION_TICK_INTERVAL = 1.0
+# Ticks a clock that has fallen behind runs back to back before dropping the rest.
+SIMULATION_MAX_CATCH_UP = 5
+# Worker threads running Simulatable solves (SpaceRooms, cores).
+SIMULATION_WORKERS = 4
+# Most solves allowed in flight at once, extra work is skipped for the tick.
+# None only limits each simulator to one solve in flight.
+SIMULATION_MAX_QUEUE = None
+# Ground and solve Simulatable programs in a pool of solver processes so a
+# busy shard can use every CPU. Results are applied back on the reactor.
+SIMULATION_SOLVE_IN_PROCESS = False
+# Number of solver processes, None for one per CPU.
+SIMULATION_SOLVER_PROCESSES = None
+SIMULATION_SOLVER_START_METHOD = "spawn"
+# Wall-clock seconds a Simulatable gets to ground and solve its program, and the
+# most atoms its ground program may have. A program over budget is interrupted
+# and fails with the clingo statistics in its error. None for no limit.
+# The timeout is deliberately wall-clock, not CPU time: it has to fit inside the
+# scheduler's tick, which a solve starved of CPU holds up just the same.
+SIMULATION_SOLVE_TIMEOUT = 0.5
+SIMULATION_MAX_GROUND_ATOMS = 100000
+# Solve results kept for cores whose programs and facts repeat, shared by all cores.
+SIMULATION_SOLVE_MEMO_SIZE = 1024
+# Seconds between checks for edits to cached .pl programs in prolog/.
+SIMULATION_PROGRAM_CHECK_INTERVAL = 5.0
+# Seconds between database writes of in-memory counters such as storedEnergy and
+# storedFuel. A crash loses at most this much.
+SIMULATION_CHECKPOINT_INTERVAL = 30
+
+
 ######################################################################
 # Settings given in secret_settings.py override those in this file.
 ######################################################################
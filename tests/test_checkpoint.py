@@ -0,0 +1,63 @@
+from evennia.utils import create
+from evennia.utils.test_resources import EvenniaCommandTest
+from unittest.mock import MagicMock
+
+from typeclasses.subsystems.base import DefaultReactor
+from prolog.checkpoint import CHECKPOINTS, flush_checkpoints
+
+from evennia import TICKER_HANDLER as tickerhandler
+
+class TestCheckpointedAttributes(EvenniaCommandTest):
+    def setUp(self):
+        super().setUp()
+        tickerhandler.add = MagicMock(name='add')
+        tickerhandler.remove = MagicMock(name='remove')
+
+        self.reactor = create.create_object(DefaultReactor, key="reactor", location=self.room1)
+        flush_checkpoints()
+
+    def test_writes_stay_in_memory_until_flushed(self):
+        self.reactor.storedFuel = 12
+        self.reactor.storedEnergy = 4
+
+        self.assertEqual(self.reactor.storedFuel, 12)
+        self.assertEqual(self.reactor.storedEnergy, 4)
+        self.assertNotEqual(self.reactor.attributes.get("storedFuel"), 12)
+
+        self.assertEqual(flush_checkpoints(), 2)
+
+        self.assertEqual(self.reactor.attributes.get("storedFuel"), 12)
+        self.assertEqual(self.reactor.attributes.get("storedEnergy"), 4)
+        self.assertEqual(len(CHECKPOINTS), 0)
+
+    def test_ticks_do_not_touch_the_database(self):
+        self.reactor.at_power_on()
+        self.reactor.storedFuel = 100
+        flush_checkpoints()
+
+        for _ in range(5):
+            self.reactor.at_tick()
+
+        self.assertEqual(self.reactor.storedFuel, 95)
+        self.assertEqual(self.reactor.attributes.get("storedFuel"), 100)
+
+    def test_power_off_checkpoints(self):
+        self.reactor.at_power_on()
+        self.reactor.storedFuel = 7
+
+        self.reactor.at_power_off()
+
+        self.assertEqual(self.reactor.attributes.get("storedFuel"), 7)
+        self.assertEqual(self.reactor.attributes.get("storedEnergy"), 0)
+        self.assertEqual(len(CHECKPOINTS), 0)
+
+    def test_cache_flush_and_delete(self):
+        self.reactor.storedFuel = 3
+        self.reactor.at_idmapper_flush()
+
+        self.assertEqual(self.reactor.attributes.get("storedFuel"), 3)
+
+        self.reactor.storedFuel = 2
+        self.reactor.delete()
+
+        self.assertEqual(len(CHECKPOINTS), 0)
@@ -0,0 +1,26 @@
+from evennia.utils.test_resources import EvenniaCommandTest
+
+from prolog.grounding_cost import superlinear_rules, fact_predicates
+
+class TestGroundingCost(EvenniaCommandTest):
+    def test_independent_joins_are_flagged(self):
+        program = "\n".join([
+            "near(A,B) :- body(A,X,Y,_,_,_,_,_,_), body(B,X2,Y2,_,_,_,_,_,_), A != B.",
+            "same(A) :- body(A,X,_,_,_,_,_,_,_), body(A,_,X,_,_,_,_,_,_).",
+            "seen(B) :- body(B,_,_,_,_,_,_,_,_), blip(S), S = B.",
+            "warn(B) :- body(B,_,_,_,_,_,_,_,_), blip(S), fake_sensor(V).",
+        ])
+
+        flagged = superlinear_rules(program, {"body", "blip", "fake_sensor"})
+
+        self.assertEqual([(line, degree) for line, degree, _ in flagged], [(1, 2), (4, 3)])
+        self.assertEqual(flagged[0][2].startswith("near(A,B) :- "), True)
+
+    def test_only_scaling_facts_count(self):
+        # max_velocity/1 is one registry fact, it doesn't grow with the world
+        program = 'command("thrust n") :- body(_, _, _, _, VY, _, _, _, _), max_velocity(Max), VY < -Max.'
+
+        self.assertEqual(superlinear_rules(program), [])
+
+    def test_fact_predicates(self):
+        self.assertEqual(fact_predicates("fake_sensor(10).\nbody(1,0,0,0,0,0,0,1,0).\n% comment"), {"fake_sensor", "body"})
@@ -5,7 +5,9 @@ from evennia.utils.test_resources import EvenniaTest, EvenniaCommandTest
 from unittest.mock import patch, MagicMock
 from typeclasses.objects import Object
 from prolog.hardcodable import Hardcodable, HardcodeProgram
+from prolog.scheduler import SCHEDULER
 
+import clingo
 import random
 import time
 
@@ -17,6 +19,14 @@ class MySensor:
         return f"fake_sensor(10)."
 
 
+class MySymbolSensor:
+    def to_fact(self):
+        return f"fake_sensor(20)."
+
+    def to_symbols(self):
+        return [("fake_sensor", (20,))]
+
+
 class TestHardcodeSystem(EvenniaCommandTest):
     def setUp(self):
         super().setUp()
@@ -108,6 +118,35 @@ class TestHardcodeSystem(EvenniaCommandTest):
 
         self.assertEqual("MATCHED COMMAND:" in logs, True)
 
+    def test_program_run_in_solver_process(self):
+        self.hc_program.hardcode_content = "command(\"look\"). #show command/1."
+        self.pc.solve_in_process = True
+        self.pc.debugging = True
+        self.pc.load_program("smoke_test")
+        self.pc.run_program("smoke_test")
+
+        # The first solve pays for starting the solver process
+        for _ in range(20):
+            if "MATCHED COMMAND:" in "\n".join(self.pc.logs):
+                break
+            time.sleep(0.5)
+
+        self.assertEqual("MATCHED COMMAND:" in "\n".join(self.pc.logs), True)
+
+    def test_program_sees_symbol_and_string_sensors(self):
+        self.hc_program.hardcode_content = "command(\"look\") :- fake_sensor(10), fake_sensor(20), currentTime(T). #show command/1."
+        self.pc.add_sensor(MySensor())
+        self.pc.add_sensor(MySymbolSensor())
+        self.pc.debugging = True
+        self.pc.load_program("smoke_test")
+        self.pc.run_program("smoke_test")
+
+        time.sleep(1)
+
+        self.assertEqual(self.pc.failure, False)
+        self.assertEqual("MATCHED COMMAND:" in "\n".join(self.pc.logs), True)
+        self.assertEqual("fake_sensor(20)." in self.pc.view_data_stream(), True)
+
     def test_program_exception(self):
         self.hc_program.hardcode_content = "thiswill(failNoPeriod)"
         self.pc.load_program("smoke_test")
@@ -116,12 +155,57 @@ class TestHardcodeSystem(EvenniaCommandTest):
         time.sleep(1)
         logs = "\n".join(self.pc.logs)
 
-        self.assertEqual(self.pc.simulation_thread, None)
+        self.assertEqual(self.pc.is_simulating(), False)
         self.assertEqual(self.pc.failure, True)
 
         self.assertEqual("ERROR MSG:" in self.pc.last_error , True)
         self.assertEqual(f"|rProgram failure. Clear error to continue." in self.pc.last_error, True)
 
+    def run_one_tick(self, content):
+        self.hc_program.hardcode_content = content
+        self.pc.load_program("smoke_test")
+        self.pc.run_program("smoke_test")
+        self.take_off_clock()
+        self.pc.clear_failure()
+
+        return self.pc.run_simulation()
+
+    def test_program_over_the_atom_budget_fails(self):
+        self.pc.max_ground_atoms = 1000
+
+        self.assertEqual(self.run_one_tick("n(1..30). p(X,Y,Z) :- n(X), n(Y), n(Z). #show p/3."), False)
+
+        self.assertEqual(self.pc.failure, True)
+        self.assertEqual("atoms, over the budget of 1000." in self.pc.last_error, True)
+
+    def test_program_over_the_time_budget_is_interrupted(self):
+        # Thirteen pigeons, twelve holes: hopeless, but only clingo's conflicts find out
+        self.pc.solve_timeout = 0.2
+        started = time.monotonic()
+
+        self.assertEqual(self.run_one_tick("p(1..13). h(1..12). 1 { at(P,H) : h(H) } 1 :- p(P). :- at(P,H), at(Q,H), P < Q."), False)
+
+        self.assertEqual(time.monotonic() - started < 5, True)
+        self.assertEqual("interrupted after the budget of 0.2s" in self.pc.last_error, True)
+        self.assertEqual("conflicts" in self.pc.last_error, True)
+
+        # Within budget again once the error is cleared
+        self.pc.solve_timeout = None
+        self.assertEqual(self.run_one_tick("hello(world). #show hello/1."), False)
+        self.assertEqual(self.pc.failure, False)
+
+    def test_program_test_reports_grounding_cost(self):
+        self.hc_program.hardcode_content = "pair(A,B) :- fake_sensor(A), fake_sensor(B). #show pair/2."
+        self.pc.add_sensor(MySensor())
+        self.pc.msg = MagicMock(name="msg")
+
+        self.hc_program.test_program(self.pc)
+
+        messages = "\n".join(call.args[0] for call in self.pc.msg.call_args_list)
+        self.assertEqual("pair(10,10)" in messages, True)
+        self.assertEqual("|gGrounding: " in messages, True)
+        self.assertEqual("Line 1: joins 2 groups of body/sensor facts" in messages, True)
+
     def test_registry_fact_setting_and_retrieving(self):
         self.assertEqual(self.pc.set_registry(1, "maxVelocity(1)."), True)
 
@@ -136,3 +220,117 @@ class TestHardcodeSystem(EvenniaCommandTest):
         self.assertEqual(self.pc.toggle_registry(1), True)
 
         self.assertEqual(self.pc.get_registry(1), "maxVelocity(1).")
+
+    def test_running_programs_compile_once(self):
+        self.pc.load_program("smoke_test")
+        self.pc.run_program("smoke_test")
+
+        compiled = self.pc.compiled_program()
+        self.assertIs(self.pc.simulation_program(), compiled)
+        self.assertEqual("hello(world)." in compiled.text, True)
+
+        # The registry changes between ticks, so it isn't part of the compiled program
+        self.pc.set_registry(1, "maxVelocity(1).")
+        self.assertIs(self.pc.compiled_program(), compiled)
+        self.assertEqual("maxVelocity(1)." in self.pc.simulation_facts()[1][0], True)
+
+        self.hc_program.editor_save(self.pc, "hello(there). #show hello/1.")
+        edited = self.pc.compiled_program()
+        self.assertIsNot(edited, compiled)
+        self.assertEqual("hello(there)." in edited.text, True)
+
+        # Written directly, as @set would, the text's hash still gives it away
+        self.hc_program.hardcode_content = "hello(again). #show hello/1."
+        self.assertEqual("hello(again)." in self.pc.compiled_program().text, True)
+
+        self.pc.kill_program("smoke_test")
+        self.assertEqual("hello" in self.pc.compiled_program().text, False)
+
+    def test_cores_share_identical_programs(self):
+        other = create.create_object(MyHardcodeComputer, key="other pc")
+        copy = create.create_object(HardcodeProgram, key="smoke_test")
+        copy.hardcode_content = self.hc_program.hardcode_content
+        copy.move_to(other)
+
+        for core in (self.pc, other):
+            core.load_program("smoke_test")
+            core.run_program("smoke_test")
+
+        self.assertIs(self.pc.compiled_program().programs[0], other.compiled_program().programs[0])
+
+        copy.editor_save(other, "hello(there). #show hello/1.")
+        self.assertIsNot(self.pc.compiled_program().programs[0], other.compiled_program().programs[0])
+
+    def test_actions_dispatch_on_symbol_name(self):
+        self.take_off_clock()
+        self.pc.execute_command = MagicMock(name="execute_command")
+        symbols = [clingo.parse_term(term) for term in [
+            'command("thrust n")', 'command("thrust n")', 'command("look")',
+            'hello(world)', 'command(look)', 'command("a", "b")',
+            'set_register(2, "maxVelocity(3).")', 'set_register(3, speed(4))', 'set_register(99, "nope.")',
+            'log("hello")', 'log(speed(4))',
+        ]]
+
+        self.pc.parse_clingo_symbols(symbols)
+        self.pc.run_queued_commands()
+
+        self.assertEqual([call.args[0] for call in self.pc.execute_command.call_args_list], ["thrust n", "look"])
+        self.assertEqual(self.pc.get_registry(2), "maxVelocity(3).")
+        self.assertEqual(self.pc.get_registry(3), "speed(4).")
+        self.assertEqual("Program log: hello" in self.pc.logs, True)
+        self.assertEqual("Program log: speed(4)" in self.pc.logs, True)
+
+    def test_command_strings_are_unescaped(self):
+        self.take_off_clock()
+        self.pc.execute_command = MagicMock(name="execute_command")
+
+        self.pc.parse_clingo_symbols([clingo.String('say "hi"')])
+        self.pc.parse_clingo_symbols([clingo.Function("command", [clingo.String('say "hi"')])])
+        self.pc.run_queued_commands()
+
+        self.pc.execute_command.assert_called_once_with('say "hi"')
+
+    def take_off_clock(self):
+        # Tick the core by hand, without the shared clock draining its queue in between
+        self.pc.ignore(self.pc)
+        SCHEDULER.unregister(self.pc)
+
+        while id(self.pc) in SCHEDULER.in_flight:
+            time.sleep(0.01)
+
+    def test_commands_queue_coalesce_and_respect_budget(self):
+        self.take_off_clock()
+        self.pc.execute_command = MagicMock(name="execute_command")
+        self.pc.commands_per_tick = 2
+
+        # Two models in one tick, both asking for thrust
+        self.pc.parse_clingo_symbols([clingo.parse_term('command("thrust n")'), clingo.parse_term('command("look")')])
+        self.pc.parse_clingo_symbols([clingo.parse_term('command("thrust n")'), clingo.parse_term('command("scan")')])
+
+        self.assertEqual(self.pc.execute_command.call_count, 0)
+        self.assertEqual(len(self.pc.command_queue), 3)
+
+        self.pc.run_queued_commands()
+
+        self.assertEqual([call.args[0] for call in self.pc.execute_command.call_args_list], ["thrust n", "look"])
+        self.assertEqual(self.pc.command_queue.coalesced, 1)
+        self.assertEqual(self.pc.command_queue.dropped, 1)
+        self.assertEqual("Dropped 1 commands over the budget of 2 per tick." in self.pc.logs, True)
+
+        # The next tick starts fresh
+        self.pc.parse_clingo_symbols([clingo.parse_term('command("thrust n")')])
+        self.pc.run_queued_commands()
+        self.assertEqual(self.pc.execute_command.call_count, 3)
+
+    def test_simulate_runs_the_ticks_commands(self):
+        self.hc_program.hardcode_content = "command(\"look\"). #show command/1."
+        self.pc.execute_command = MagicMock(name="execute_command")
+        self.pc.load_program("smoke_test")
+        self.pc.run_program("smoke_test")
+        self.take_off_clock()
+        self.pc.command_queue.drain(0)
+        self.pc.execute_command.reset_mock()
+
+        self.pc.simulate()
+
+        self.pc.execute_command.assert_called_with("look")
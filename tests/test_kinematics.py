@@ -0,0 +1,47 @@
+from evennia.utils import create
+from evennia.utils.test_resources import EvenniaCommandTest
+
+from typeclasses.objects import SpaceRoom
+from typeclasses.vehicles.base import DefaultSpaceShip
+from prolog.kinematics import KinematicState
+
+class TestKinematics(EvenniaCommandTest):
+    def setUp(self):
+        super().setUp()
+        self.ship = create.create_object(DefaultSpaceShip, key="ship")
+
+    def test_state_behaves_like_the_dict(self):
+        state = KinematicState({"x": 1, "y": 2, "Fx": 0, "Fy": 0, "Vx": 0, "Vy": 0, "fuel": 3})
+        state["x"] += 4
+
+        self.assertEqual(state["x"], 5)
+        self.assertEqual(state.x, 5)
+        self.assertEqual(state["fuel"], 3)
+        self.assertEqual(state, {"x": 5, "y": 2, "Fx": 0, "Fy": 0, "Vx": 0, "Vy": 0, "fuel": 3})
+        self.assertEqual("wasMoving" in state, False)
+
+        with self.assertRaises(KeyError):
+            state["wasMoving"]
+
+    def test_writes_go_to_the_state(self):
+        self.ship.newtonian_data["x"] = 42
+
+        self.assertIsInstance(self.ship.newtonian_data, KinematicState)
+        self.assertIs(self.ship.newtonian_data, self.ship.newtonian_data)
+        self.assertEqual(self.ship.newtonian_data["x"], 42)
+
+    def test_assignment_replaces_state(self):
+        self.ship.newtonian_data = {"x": 7, "y": 8, "Fx": 0, "Fy": 0, "Vx": 0, "Vy": 0, "wasMoving": False}
+
+        self.assertEqual(self.ship.newtonian_data["x"], 7)
+        self.assertEqual(self.ship.nattributes.get("newtonian_data")["x"], 7)
+
+    def test_leaving_a_space_room_keeps_the_state(self):
+        space_room = create.create_object(SpaceRoom, key="space_room")
+        space_room.to_simulate[self.ship.id] = self.ship
+        self.ship.newtonian_data["Vx"] = 3
+
+        space_room.at_object_leave(self.ship, self.room1)
+
+        self.assertEqual(self.ship.newtonian_data["Vx"], 3)
+        self.assertEqual(self.ship.id in space_room.to_simulate, False)
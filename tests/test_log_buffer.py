@@ -0,0 +1,84 @@
+from evennia.utils import create
+from evennia.utils.test_resources import EvenniaCommandTest
+
+from prolog.hardcodable import Hardcodable
+from prolog.log_buffer import LogBuffer
+from commands.core import CmdCoreShowLogs
+
+class LogComputer(Hardcodable):
+    pass
+
+class CountingSymbols:
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "[hello(world)]"
+
+class TestLogBuffer(EvenniaCommandTest):
+    def test_reads_like_a_list(self):
+        logs = LogBuffer(capacity=5)
+        self.assertEqual(logs, [])
+
+        logs.append("one")
+        logs.debug("two {}", 2)
+
+        self.assertEqual(logs, ["one", "two 2"])
+        self.assertEqual(len(logs), 2)
+        self.assertEqual(logs[-1], "two 2")
+        self.assertEqual(logs[-10:], ["one", "two 2"])
+        self.assertEqual("\n".join(logs), "one\ntwo 2")
+        self.assertEqual("one" in logs, True)
+
+    def test_oldest_lines_fall_off(self):
+        logs = LogBuffer(capacity=3)
+        for i in range(10):
+            logs.info("line {}", i)
+
+        self.assertEqual(logs, ["line 7", "line 8", "line 9"])
+
+        logs.resize(2)
+        self.assertEqual(logs, ["line 8", "line 9"])
+
+    def test_levels_filter(self):
+        logs = LogBuffer()
+        logs.debug("chatter")
+        logs.info("loaded")
+        logs.error("failed")
+
+        self.assertEqual(logs.lines("info"), ["loaded", "failed"])
+        self.assertEqual(logs.lines("error"), ["failed"])
+        self.assertEqual(logs.lines(), ["chatter", "loaded", "failed"])
+
+    def test_symbols_are_formatted_only_when_read(self):
+        pc = create.create_object(LogComputer, key="pc")
+        symbols = CountingSymbols()
+
+        for _ in range(100):
+            pc.parse_clingo_symbols([])
+            pc.logs.debug("{}", symbols)
+
+        self.assertEqual(symbols.formatted, 0)
+        self.assertEqual(pc.logs[-1], "[hello(world)]")
+        self.assertEqual(symbols.formatted, 1)
+
+    def test_capacity_is_per_core(self):
+        pc = create.create_object(LogComputer, key="pc")
+        pc.log_capacity = 4
+
+        for i in range(10):
+            pc.logs.info("line {}", i)
+
+        self.assertEqual(len(pc.logs), 4)
+        self.assertEqual(pc.logs[0], "line 6")
+
+    def test_logs_command_shows_the_latest_lines(self):
+        pc = create.create_object(LogComputer, key="pc")
+        pc.logs.debug("chatter")
+        pc.logs.info("loaded")
+        pc.logs.error("failed")
+
+        self.call(CmdCoreShowLogs(), "--lines 2", "loaded\nfailed", caller=pc)
+        self.call(CmdCoreShowLogs(), "--level error", "failed", caller=pc)
+        self.call(CmdCoreShowLogs(), "--lines 0", "lines must be at least 1.", caller=pc)
@@ -0,0 +1,154 @@
+from evennia.utils import create
+from evennia.utils.test_resources import EvenniaCommandTest
+from unittest.mock import patch, MagicMock
+import threading
+
+from prolog.reactor import ReactorMailbox
+from prolog.simulatable import Simulatable
+from typeclasses.objects import SpaceRoom
+from typeclasses.vehicles.base import DefaultSpaceShip
+from typeclasses.subsystems.base import DefaultCore
+
+class BrokenModelRoom(Simulatable):
+    def program(self):
+        return "a(1). #show a/1."
+
+    def update(self, model):
+        raise ValueError("bad model")
+
+class TestReactorMailbox(EvenniaCommandTest):
+    def setUp(self):
+        super().setUp()
+        self.mailbox = ReactorMailbox()
+        self.applied = []
+
+        reactor = patch("prolog.reactor.reactor")
+        self.reactor = reactor.start()
+        self.reactor.running = True
+        self.addCleanup(reactor.stop)
+
+    def apply(self, value):
+        self.applied.append(value)
+
+    def deliver_all(self, mailbox=None):
+        # Only this mailbox's batches, the shared clock may be flushing its own meanwhile
+        if mailbox == None:
+            mailbox = self.mailbox
+
+        for call in self.reactor.callFromThread.call_args_list:
+            if call.args[0] == mailbox.deliver:
+                call.args[0](*call.args[1:])
+
+    def test_a_tick_is_delivered_in_one_callback(self):
+        self.mailbox.post(self.apply, "power")
+        self.mailbox.post(self.apply, "physics")
+        self.mailbox.post(self.apply, "programs")
+
+        self.assertEqual(self.applied, [])
+        self.assertEqual(self.mailbox.flush(), 3)
+        self.assertEqual([call.args[0] for call in self.reactor.callFromThread.call_args_list].count(self.mailbox.deliver), 1)
+
+        self.deliver_all()
+
+        self.assertEqual(self.applied, ["power", "physics", "programs"])
+        self.assertEqual((self.mailbox.deliveries, self.mailbox.delivered), (1, 3))
+        self.assertEqual(self.mailbox.flush(), 0)
+
+    def test_keyed_results_coalesce_to_the_newest(self):
+        self.mailbox.post(self.apply, "positions 1", key="room")
+        self.mailbox.post(self.apply, "model")
+        self.mailbox.post(self.apply, "positions 2", key="room")
+
+        self.mailbox.flush()
+        self.deliver_all()
+
+        self.assertEqual(self.applied, ["model", "positions 2"])
+        self.assertEqual(self.mailbox.coalesced, 1)
+
+    def test_a_failing_result_does_not_stop_the_batch(self):
+        self.mailbox.post(lambda: 1 / 0)
+        self.mailbox.post(self.apply, "after")
+
+        self.mailbox.flush()
+        self.deliver_all()
+
+        self.assertEqual(self.applied, ["after"])
+
+    def test_failures_go_to_the_posters_error_callback(self):
+        errors = []
+        self.mailbox.post(lambda: 1 / 0, on_error=errors.append)
+        self.mailbox.post(self.apply, "after", on_error=errors.append)
+
+        self.mailbox.flush()
+        self.deliver_all()
+
+        self.assertEqual([type(error) for error in errors], [ZeroDivisionError])
+        self.assertEqual(self.applied, ["after"])
+
+    def test_a_result_that_fails_to_apply_fails_the_simulator(self):
+        room = BrokenModelRoom()
+        room.to_simulate[1] = MagicMock(to_symbols=lambda: None, to_fact=lambda: "b(1).")
+
+        with patch("prolog.simulatable.MAILBOX", self.mailbox):
+            self.assertEqual(room.run_simulation(), True)
+
+        self.mailbox.flush()
+        self.deliver_all()
+
+        self.assertEqual(room.failure, True)
+        self.assertEqual("ERROR MSG: bad model" in room.last_error, True)
+        self.assertEqual(room.run_simulation(), False)
+
+    def test_flush_can_wait_for_the_reactor(self):
+        # A reactor thread that applies batches a little later
+        self.reactor.callFromThread.side_effect = lambda function, *args: threading.Timer(0.05, function, args).start()
+        self.mailbox.post(self.apply, "physics")
+
+        self.assertEqual(self.mailbox.flush(timeout=5), 1)
+        self.assertEqual(self.applied, ["physics"])
+
+    def test_core_messages_from_the_solve_go_through_the_reactor(self):
+        core = create.create_object(DefaultCore, key="core")
+        core.msg = MagicMock()
+
+        with patch("prolog.hardcodable.MAILBOX", self.mailbox), patch("typeclasses.subsystems.base.MAILBOX", self.mailbox):
+            core.control_logger_callback("warning", "info: atom undefined")
+            core.to_symbols()
+
+        core.msg.assert_not_called()
+
+        self.mailbox.flush()
+        self.deliver_all()
+
+        self.assertEqual(core.msg.call_count, 2)
+        self.assertEqual("atom undefined" in core.msg.call_args_list[0].args[0], True)
+        self.assertEqual(core.failure, True)
+
+    def test_applies_straight_away_without_a_reactor(self):
+        self.reactor.running = False
+
+        self.mailbox.post(self.apply, "now")
+
+        self.assertEqual(self.applied, ["now"])
+        self.assertEqual(len(self.mailbox), 0)
+
+    def test_space_room_positions_wait_for_the_reactor(self):
+        mailbox = ReactorMailbox()
+        room = create.create_object(SpaceRoom, key="space_room")
+        room.physics_backend = "numpy"
+        ship = create.create_object(DefaultSpaceShip, key="ship")
+        ship.move_to(room)
+        ship.newtonian_data["Vx"] = 2
+
+        with patch("typeclasses.objects.MAILBOX", mailbox):
+            room.simulate()
+            room.simulate()
+
+        self.assertEqual(ship.newtonian_data["x"], 0)
+
+        mailbox.flush()
+        self.deliver_all(mailbox)
+
+        # Both ticks stepped from the same state, only the newest is applied
+        self.assertEqual(ship.newtonian_data["x"], 2)
+        self.assertEqual(mailbox.coalesced, 1)
@@ -0,0 +1,133 @@
+from evennia.utils import create
+from evennia.utils.test_resources import EvenniaTest, EvenniaCommandTest
+from unittest import skipUnless
+import os
+import time
+
+import clingo
+
+from typeclasses.objects import SpaceRoom
+from prolog.physics import ClingoBackend, IncrementalClingoBackend, NumpyBackend, PhysicsBackend, make_backend, numpy
+from prolog.decoder import ModelDecoder
+from prolog.symbols import SymbolModel
+
+class TestPhysicsBackends(EvenniaCommandTest):
+    def setUp(self):
+        super().setUp()
+
+        #         (B, Ix,  Iy, IVx, IVy, Fx, Fy, M)
+        self.bodies = {
+            1: (1,   0,   0,   0,   0,  1,  0, 1),
+            2: (2,  20,  22,  -3,   2, -1, -1, 1),
+            3: (3,  16,  16,   0,  -1,  0,  1, 1),
+            4: (4, -40, 100,   7,   0, -3,  5, 2),
+        }
+
+    def trajectory(self, backend, ticks=25):
+        bodies = dict(self.bodies)
+        trajectory = []
+
+        for tick in range(ticks):
+            # Change some forces along the way so thrust changes are covered too
+            if tick == 10:
+                b, ix, iy, ivx, ivy, fx, fy, m = bodies[1]
+                bodies[1] = (b, ix, iy, ivx, ivy, -2, 3, m)
+
+            if tick == 15:
+                del bodies[3]
+
+            positions = sorted(backend.step(bodies))
+            trajectory.append(positions)
+
+            for b, px, py, vx, vy in positions:
+                _, _, _, _, _, fx, fy, m = bodies[b]
+                bodies[b] = (b, px, py, vx, vy, fx, fy, m)
+
+        return trajectory
+
+    def test_incremental_parity_with_reference(self):
+        self.assertEqual(self.trajectory(IncrementalClingoBackend()), self.trajectory(ClingoBackend()))
+
+    @skipUnless(numpy, "numpy is not installed")
+    def test_numpy_parity_with_reference(self):
+        self.assertEqual(self.trajectory(NumpyBackend()), self.trajectory(ClingoBackend()))
+
+    def test_empty_room(self):
+        for name in ["clingo", "incremental", "numpy"]:
+            self.assertEqual(make_backend(name).step({}), [])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(Exception):
+            make_backend("verlet")
+
+    def test_space_room_backend_switch(self):
+        space_room = create.create_object( SpaceRoom, key="space_room" )
+
+        self.assertEqual(space_room.physics().name, "incremental")
+
+        space_room.physics_backend = "clingo"
+        self.assertEqual(space_room.physics().name, "clingo")
+
+        space_room.physics_backend = "numpy"
+        self.assertEqual(space_room.physics().name, "numpy" if numpy else "incremental")
+
+
+class TestModelDecoding(EvenniaCommandTest):
+    def model(self, count):
+        symbols = []
+        for body in range(count):
+            arguments = [1, body, body * 3, -body, body % 7 - 3, -2]
+            symbols.append(clingo.Function("time_body_position", [clingo.Number(argument) for argument in arguments]))
+
+        return SymbolModel(symbols)
+
+    def string_decode(self, model):
+        # The str-replace parsing SpaceRoom.update used to do
+        positions = []
+        for fact in model.symbols(shown=True):
+            time_step, body, px, py, vx, vy = [int(strPart) for strPart in str(fact).replace("time_body_position(", "").replace(")", "").split(",")]
+            positions.append((body, px, py, vx, vy))
+
+        return positions
+
+    def argument_decode(self, model):
+        # Reading each argument's .number instead
+        return [tuple(argument.number for argument in fact.arguments[1:]) for fact in model.symbols(shown=True)]
+
+    def best_decode_time(self, decode, model, runs=20):
+        # Fastest of several runs, the least disturbed by whatever else the machine does
+        best = None
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            decode(model)
+            elapsed = time.perf_counter() - start_time
+            best = elapsed if best == None else min(best, elapsed)
+        return best
+
+    def test_decode_matches_string_parsing(self):
+        model = self.model(50)
+        self.assertEqual(PhysicsBackend.decode(model), self.string_decode(model))
+
+    def test_decoder_skips_unhandled_symbols(self):
+        decoder = ModelDecoder({"seen": lambda symbol, text: symbol.arguments[0].number})
+        symbols = [clingo.Function("seen", [clingo.Number(4)]), clingo.Function("other", [clingo.Number(5)])]
+
+        self.assertEqual(decoder.decode(symbols), [4])
+
+    def test_decode_a_thousand_bodies(self):
+        model = self.model(1000)
+
+        self.assertEqual(PhysicsBackend.decode(model), self.argument_decode(model))
+
+        self.assertEqual(len(PhysicsBackend.decode(model)), 1000)
+
+    @skipUnless(os.environ.get("SIMULATION_BENCHMARKS"), "set SIMULATION_BENCHMARKS=1 to run benchmarks")
+    def test_decode_cost_per_thousand_bodies(self):
+        # Formatting each symbol once beats reading .arguments[i].number, which
+        # crosses into clingo for every argument
+        model = self.model(1000)
+
+        decoder = self.best_decode_time(PhysicsBackend.decode, model)
+        arguments = self.best_decode_time(self.argument_decode, model)
+
+        self.assertLess(decoder, arguments, f"Per 1000 bodies: {decoder * 1000:.3f}ms decoder, {arguments * 1000:.3f}ms reading .number")
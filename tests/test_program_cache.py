@@ -0,0 +1,116 @@
+from evennia.utils.test_resources import EvenniaCommandTest
+import gc
+import os
+import tempfile
+
+import clingo
+
+from prolog.program_cache import ProgramCache, ProgramStore, CompiledProgramSet, PROGRAM_CACHE
+from prolog.physics import IncrementalClingoBackend, INCREMENTAL_PROGRAM
+
+class TestProgramCache(EvenniaCommandTest):
+    def setUp(self):
+        super().setUp()
+        handle, self.path = tempfile.mkstemp(suffix=".pl")
+        os.close(handle)
+        self.write("a(1).\n#show a/1.\n")
+
+    def tearDown(self):
+        os.remove(self.path)
+        super().tearDown()
+
+    def write(self, text, mtime_ns=None):
+        with open(self.path, 'w') as file:
+            file.write(text)
+
+        if mtime_ns:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def shown(self, entry):
+        ctl = clingo.Control()
+        entry.add_to(ctl)
+        ctl.ground([("base", [])])
+
+        symbols = []
+        ctl.solve(on_model=lambda model: symbols.extend(str(s) for s in model.symbols(shown=True)))
+        return symbols
+
+    def test_reuses_entry_between_checks(self):
+        cache = ProgramCache(check_interval=60)
+        entry = cache.get(self.path)
+
+        self.write("a(2).\n#show a/1.\n", mtime_ns=os.stat(self.path).st_mtime_ns + 10**9)
+
+        self.assertIs(cache.get(self.path), entry)
+        self.assertEqual(self.shown(entry), ["a(1)"])
+
+    def test_reloads_when_file_changes(self):
+        cache = ProgramCache(check_interval=0)
+        entry = cache.get(self.path)
+        self.assertIs(cache.get(self.path), entry)
+
+        self.write("a(2).\n#show a/1.\n", mtime_ns=os.stat(self.path).st_mtime_ns + 10**9)
+
+        reloaded = cache.get(self.path)
+        self.assertIsNot(reloaded, entry)
+        self.assertEqual(self.shown(reloaded), ["a(2)"])
+
+    def test_incremental_backend_keeps_control_while_program_unchanged(self):
+        backend = IncrementalClingoBackend()
+        backend.step({1: (1, 0, 0, 0, 0, 1, 0, 1)})
+        control = backend.incremental_control
+
+        backend.step({1: (1, 1, 0, 1, 0, 1, 0, 1)})
+
+        self.assertIs(backend.incremental_control, control)
+        self.assertIs(backend.program, PROGRAM_CACHE.get(INCREMENTAL_PROGRAM))
+
+    def test_store_parses_each_text_once(self):
+        store = ProgramStore()
+        first = store.get("a(1).\n#show a/1.\n")
+
+        self.assertIs(store.get("a(1).\n#show a/1.\n"), first)
+        self.assertIsNot(store.get("a(2).\n#show a/1.\n"), first)
+        self.assertEqual((store.hits, store.misses), (1, 2))
+
+        # Nobody holds a(2) any more
+        gc.collect()
+        self.assertEqual(len(store), 1)
+
+    def test_store_does_not_keep_parse_errors(self):
+        store = ProgramStore()
+
+        with self.assertRaises(RuntimeError):
+            store.get("thiswill(failNoPeriod)")
+
+        self.assertEqual(len(store), 0)
+
+    def test_program_set_grounds_its_parts_together(self):
+        store = ProgramStore()
+        programs = CompiledProgramSet([store.get("a(1)."), store.get("b(X) :- a(X).\n#show b/1.")])
+
+        self.assertEqual(self.shown(programs), ["b(1)"])
+        self.assertEqual("a(1)." in programs.text, True)
+
+    def test_program_set_digest_follows_its_parts(self):
+        store = ProgramStore()
+        programs = CompiledProgramSet([store.get("a(1)."), store.get("b(1).")])
+
+        self.assertEqual(programs.digest, CompiledProgramSet([store.get("a(1)."), store.get("b(1).")]).digest)
+        self.assertNotEqual(programs.digest, CompiledProgramSet([store.get("a(1)."), store.get("b(2).")]).digest)
+        self.assertEqual("text" in vars(programs), False)
+
+    def test_reads_time_wherever_current_time_appears(self):
+        store = ProgramStore()
+        programs = [
+            "command(\"look\") :- currentTime(T), T > 0.",
+            "command(\"a\") : currentTime(T), T \\ 2 = 0.",
+            "{ command(T) : currentTime(T) } = 1.",
+            "command(1). #show command(T) : currentTime(T).",
+        ]
+
+        for text in programs:
+            self.assertEqual(store.get(text).reads_time, True, text)
+
+        self.assertEqual(store.get("% currentTime(T)\ncurrentTimeout(3).").reads_time, False)
+        self.assertEqual(CompiledProgramSet([store.get("a(1)."), store.get(programs[1])]).reads_time, True)
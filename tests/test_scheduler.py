@@ -0,0 +1,278 @@
+from evennia.utils.test_resources import EvenniaTest, EvenniaCommandTest
+
+from prolog.scheduler import SimulationScheduler
+from prolog.reactor import MAILBOX
+from concurrent.futures import Future, ThreadPoolExecutor
+from unittest.mock import patch
+import threading
+
+import time
+
+class FakeClock:
+    # Time that only moves when a test or a simulator moves it
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+class InlineExecutor:
+    # Runs each submission straight away on the ticking thread
+    def submit(self, function, *args):
+        future = Future()
+
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+class HeldExecutor(InlineExecutor):
+    # Holds submissions until the test lets them run, like workers still busy
+    def __init__(self):
+        self.held = []
+
+    def submit(self, function, *args):
+        self.held.append((function, args))
+        return Future()
+
+    def run_held(self):
+        held, self.held = self.held, []
+
+        for function, args in held:
+            function(*args)
+
+class CountingSimulator:
+    def __init__(self, duration=0, runs_left=None, clock=None):
+        self.duration = duration
+        self.runs_left = runs_left
+        self.clock = clock
+        self.runs = 0
+
+    def run_simulation(self):
+        self.runs += 1
+
+        if self.clock != None:
+            self.clock.advance(self.duration)
+        else:
+            time.sleep(self.duration)
+
+        if self.runs_left != None:
+            self.runs_left -= 1
+
+        return self.wants_simulation()
+
+    def wants_simulation(self):
+        return self.runs_left == None or self.runs_left > 0
+
+class PhaseSimulator(CountingSimulator):
+    def __init__(self, phase, log, duration=0):
+        super().__init__(duration=duration)
+        self.simulation_phase = phase
+        self.log = log
+
+    def run_simulation(self):
+        self.log.append(self.simulation_phase)
+        return super().run_simulation()
+
+class PostingSimulator(PhaseSimulator):
+    # Hands its result to the reactor, like SpaceRoom's positions
+    def run_simulation(self):
+        self.log.append(self.simulation_phase)
+        MAILBOX.post(self.log.append, f"applied {self.simulation_phase}")
+        return True
+
+class FailingSimulator(CountingSimulator):
+    stopped = False
+
+    def run_simulation(self):
+        super().run_simulation()
+        raise RuntimeError("broken program")
+
+    def at_simulation_stop(self):
+        self.stopped = True
+
+class TestSimulationScheduler(EvenniaCommandTest):
+    def setUp(self):
+        super().setUp()
+        # Ticks are driven by hand on a fake clock, no clock thread is started
+        self.clock = FakeClock()
+        self.scheduler = SimulationScheduler(tick_interval=0.05, max_workers=2, clock=self.clock)
+        self.scheduler.running = True
+        self.scheduler.executor = InlineExecutor()
+
+    def test_shared_clock_runs_every_simulator(self):
+        # The one test on the real clock thread
+        scheduler = SimulationScheduler(tick_interval=0.05, max_workers=2)
+        self.addCleanup(scheduler.stop)
+        simulators = [CountingSimulator() for _ in range(10)]
+        for simulator in simulators:
+            scheduler.register(simulator, run_now=False)
+
+        waited_until = time.monotonic() + 10
+        while not all(simulator.runs >= 2 for simulator in simulators) and time.monotonic() < waited_until:
+            time.sleep(0.01)
+
+        self.assertEqual(scheduler.stats()["registered"], 10)
+        self.assertEqual(all(simulator.runs >= 2 for simulator in simulators), True)
+        self.assertEqual(scheduler.clock_thread.is_alive(), True)
+
+    def test_every_tick_runs_every_simulator(self):
+        simulators = [CountingSimulator() for _ in range(10)]
+        for simulator in simulators:
+            self.scheduler.register(simulator, run_now=False)
+
+        for _ in range(3):
+            self.scheduler.tick()
+
+        self.assertEqual([simulator.runs for simulator in simulators], [3] * 10)
+        self.assertEqual(self.scheduler.stats()["ticks"], 3)
+
+    def test_backpressure_skips_busy_simulators(self):
+        executor = self.scheduler.executor = HeldExecutor()
+        slow = CountingSimulator(duration=0.3, clock=self.clock)
+        self.scheduler.register(slow, run_now=False)
+
+        # Still running the first tick's work through the next two
+        for _ in range(3):
+            self.scheduler.tick()
+
+        stats = self.scheduler.stats()
+        self.assertEqual(len(executor.held), 1)
+        self.assertEqual(stats["skipped"], 2)
+        self.assertEqual(stats["queue_depth"], 1)
+
+        executor.run_held()
+
+        self.assertEqual(slow.runs, 1)
+        self.assertEqual(self.scheduler.stats()["queue_depth"], 0)
+        self.assertAlmostEqual(self.scheduler.stats()["max_tick_latency"], 0.3)
+
+    def test_queue_cap_does_not_starve_simulators(self):
+        executor = self.scheduler.executor = HeldExecutor()
+        self.scheduler.max_queue = 3
+        simulators = [CountingSimulator() for _ in range(10)]
+        for simulator in simulators:
+            self.scheduler.register(simulator, run_now=False)
+
+        # Three at a time, each tick carrying on where the last one stopped
+        for _ in range(4):
+            self.scheduler.tick()
+            self.assertEqual(len(executor.held), 3)
+            executor.run_held()
+
+        self.assertEqual([simulator.runs for simulator in simulators], [2, 2] + [1] * 8)
+
+    def test_finished_simulators_are_unregistered(self):
+        simulator = CountingSimulator(runs_left=2)
+        self.scheduler.register(simulator)
+
+        for _ in range(3):
+            self.scheduler.tick()
+
+        self.assertEqual(simulator.runs, 2)
+        self.assertEqual(self.scheduler.is_registered(simulator), False)
+
+    def test_failed_simulators_hear_they_stopped(self):
+        simulator = FailingSimulator()
+        self.scheduler.register(simulator, run_now=False)
+
+        self.scheduler.tick()
+        self.scheduler.tick()
+
+        self.assertEqual(simulator.runs, 1)
+        self.assertEqual(self.scheduler.is_registered(simulator), False)
+        self.assertEqual(simulator.stopped, True)
+
+    def test_phases_share_the_ticks_deadline(self):
+        self.scheduler.executor = HeldExecutor()
+        for phase in self.scheduler.PHASES:
+            self.scheduler.register(PhaseSimulator(phase, []), run_now=False)
+
+        # Every phase's work outlasts whatever time it is given
+        timeouts = []
+
+        def wait(futures, timeout):
+            timeouts.append(timeout)
+            self.clock.advance(timeout)
+
+        with patch("prolog.scheduler.wait", wait):
+            self.scheduler.tick()
+
+        # One tick interval for all three phases, not one each
+        self.assertEqual(timeouts, [0.05, 0, 0])
+
+    def test_phase_results_are_applied_before_the_next_phase(self):
+        scheduler = SimulationScheduler(tick_interval=5)
+        scheduler.executor = ThreadPoolExecutor(max_workers=2)
+        log = []
+        for phase in ["programs", "physics"]:
+            simulator = PostingSimulator(phase, log)
+            scheduler.simulators[id(simulator)] = simulator
+
+        with patch("prolog.reactor.reactor") as reactor:
+            # A reactor thread that applies batches a little later
+            reactor.running = True
+            reactor.callFromThread.side_effect = lambda function, *args: threading.Timer(0.05, function, args).start()
+            scheduler.tick()
+
+        scheduler.executor.shutdown(wait=True)
+
+        self.assertEqual(log, ["physics", "applied physics", "programs", "applied programs"])
+
+    def test_ticks_run_phases_in_order(self):
+        log = []
+        for phase in ["programs", "physics", "power"]:
+            self.scheduler.register(PhaseSimulator(phase, log), run_now=False)
+
+        self.scheduler.tick()
+        self.scheduler.tick()
+
+        self.assertEqual(log, ["power", "physics", "programs"] * 2)
+
+    def test_clock_catches_up_then_drops_ticks(self):
+        self.scheduler.max_catch_up = 1
+        self.scheduler.register(CountingSimulator(), run_now=False)
+
+        # The clock stalls for three and a half ticks, as a suspended process
+        # or a long GC pause would
+        next_tick = self.clock()
+        self.clock.advance(0.175)
+
+        next_tick, delay = self.scheduler.step(next_tick)
+
+        # Two ticks are given up on, the one left is caught up straight away
+        self.assertEqual(self.scheduler.dropped, 2)
+        self.assertEqual(delay, 0)
+        self.assertEqual(self.scheduler.overruns, 1)
+        self.assertAlmostEqual(self.scheduler.max_lag, 0.075)
+
+        next_tick, delay = self.scheduler.step(next_tick)
+
+        # Back on time, waiting for the next tick
+        self.assertAlmostEqual(delay, 0.025)
+        self.assertAlmostEqual(self.scheduler.last_lag, 0.025)
+        self.assertEqual(self.scheduler.stats()["ticks"], 2)
+        self.assertEqual(self.scheduler.stats()["overrun_rate"], 0.5)
+
+    def test_light_load_keeps_time(self):
+        self.scheduler.register(CountingSimulator(duration=0.01, clock=self.clock), run_now=False)
+        next_tick = self.clock()
+
+        for _ in range(10):
+            next_tick, delay = self.scheduler.step(next_tick)
+            self.assertAlmostEqual(delay, 0.04)
+            self.clock.advance(delay)
+
+        stats = self.scheduler.stats()
+        self.assertEqual(stats["ticks"], 10)
+        self.assertEqual(stats["dropped"], 0)
+        self.assertEqual(stats["overruns"], 0)
+        self.assertAlmostEqual(stats["max_lag"], 0.0)
@@ -45,3 +45,81 @@ class TestSimulatable(EvenniaCommandTest):
         sim.track(sim)
         time.sleep(1)
         self.assertEqual(sim.opposite, "blue")
+
+class BenchBody:
+    def __init__(self, id):
+        self.id = id
+        self.fact_calls = 0
+
+    def to_fact(self):
+        self.fact_calls += 1
+        return f"body({self.id})."
+
+class SymbolBody(BenchBody):
+    def to_symbols(self):
+        return [("body", (self.id,))]
+
+class BenchRoom(Simulatable):
+    def program(self):
+        return "seen(B) :- body(B). #show seen/1."
+
+    def update(self, model):
+        self.seen = len(model.symbols(shown=True))
+
+    def control_logger_callback(self, code, message):
+        self.messages = getattr(self, "messages", []) + [message]
+
+class TestSimulatableScope(EvenniaCommandTest):
+    def populate(self, room, first_id, count):
+        bodies = [BenchBody(first_id + index) for index in range(count)]
+        for body in bodies:
+            # Register directly, track() would start a simulation loop per room
+            room.to_simulate[body.id] = body
+        return bodies
+
+    def run_ticks(self, room, ticks=20):
+        for _ in range(ticks):
+            room.simulate()
+
+    def test_registries_are_per_instance(self):
+        room_a = BenchRoom()
+        room_b = BenchRoom()
+
+        self.populate(room_a, 0, 3)
+
+        self.assertEqual(len(room_a.to_simulate), 3)
+        self.assertEqual(len(room_b.to_simulate), 0)
+
+    def test_tick_cost_flat_as_unrelated_rooms_are_added(self):
+        room = BenchRoom()
+        bodies = self.populate(room, 0, 10)
+
+        self.run_ticks(room)
+        calls_alone = sum(body.fact_calls for body in bodies)
+
+        unrelated = [BenchRoom() for _ in range(50)]
+        unrelated_bodies = []
+        for index, other in enumerate(unrelated):
+            unrelated_bodies += self.populate(other, 1000 + index * 100, 20)
+
+        self.run_ticks(room)
+        calls_crowded = sum(body.fact_calls for body in bodies) - calls_alone
+
+        # Same work per tick, and nothing outside the room was touched
+        self.assertEqual(calls_alone, calls_crowded)
+        self.assertEqual(room.seen, 10)
+        self.assertEqual(sum(body.fact_calls for body in unrelated_bodies), 0)
+
+    def test_symbol_facts_mix_with_string_facts(self):
+        room = BenchRoom()
+        strings = self.populate(room, 0, 3)
+        symbols = [SymbolBody(100 + index) for index in range(3)]
+        for body in symbols:
+            room.to_simulate[body.id] = body
+
+        room.simulate()
+
+        self.assertEqual(room.seen, 6)
+        self.assertEqual(sum(body.fact_calls for body in strings), 3)
+        self.assertEqual(sum(body.fact_calls for body in symbols), 0)
+        self.assertEqual(getattr(room, "messages", []), [])
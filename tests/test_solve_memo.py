@@ -0,0 +1,100 @@
+from evennia.utils import create
+from evennia.utils.test_resources import EvenniaCommandTest
+from unittest.mock import patch
+
+from prolog.hardcodable import Hardcodable, HardcodeProgram
+from prolog.solve_memo import SolveMemo, fingerprint
+from prolog.scheduler import SCHEDULER
+
+import clingo
+
+class MemoCore(Hardcodable):
+    pass
+
+class TestSolveMemo(EvenniaCommandTest):
+    def test_least_recently_used_goes_first(self):
+        memo = SolveMemo(capacity=2)
+        memo.put("a", ("A",))
+        memo.put("b", ("B",))
+        memo.get("a")
+        memo.put("c", ("C",))
+
+        self.assertEqual(memo.get("b"), None)
+        self.assertEqual(memo.get("a"), ("A",))
+        self.assertEqual(memo.get("c"), ("C",))
+        self.assertEqual((memo.hits, memo.misses), (3, 1))
+
+    def test_unsatisfiable_results_are_remembered(self):
+        memo = SolveMemo()
+        memo.put("unsat", ())
+
+        self.assertEqual(memo.get("unsat"), ())
+
+    def test_fingerprint_covers_symbols(self):
+        self.assertEqual(fingerprint("p", [clingo.Number(1)]), fingerprint("p", [clingo.Number(1)]))
+        self.assertNotEqual(fingerprint("p", [clingo.Number(1)]), fingerprint("p", [clingo.Number(2)]))
+
+class TestCoreSolveMemo(EvenniaCommandTest):
+    def setUp(self):
+        # Tick by hand only, the background scheduler never sees these cores
+        register = patch.object(SCHEDULER, "register")
+        register.start()
+        self.addCleanup(register.stop)
+
+        super().setUp()
+        self.memo = SolveMemo()
+        self.cores = [self.make_core(f"core {index}") for index in range(2)]
+
+    def make_core(self, key, content="command(\"look\"). #show command/1."):
+        core = create.create_object(MemoCore, key=key)
+
+        program = create.create_object(HardcodeProgram, key="idle")
+        program.hardcode_content = content
+        program.move_to(core)
+
+        core.load_program("idle")
+        core.run_program("idle")
+        core.solve_memo = self.memo
+        return core
+
+    def test_identical_cores_share_one_solve(self):
+        first, second = self.cores
+        executed = second.command_queue.executed
+
+        with patch.object(MemoCore, "solve_models", autospec=True, side_effect=MemoCore.solve_models) as solve_models:
+            first.simulate()
+            first.simulate()
+            second.simulate()
+
+        self.assertEqual(solve_models.call_count, 1)
+        self.assertEqual(self.memo.hits, 2)
+        # A hit still hands the models to update(), so the commands queue as usual
+        self.assertEqual(second.command_queue.executed, executed + 1)
+
+        # Different sensor facts, different fingerprint
+        second.set_registry(0, "maxVelocity(3).")
+        with patch.object(MemoCore, "solve_models", autospec=True, side_effect=MemoCore.solve_models) as solve_models:
+            second.simulate()
+
+        self.assertEqual(solve_models.call_count, 1)
+
+    def test_time_dependent_programs_always_solve(self):
+        clock = self.make_core("clock", "command(\"look\") :- currentTime(T), T > 0. #show command/1.")
+        opted_out = self.cores[0]
+        opted_out.running_programs["idle"].memoizable = False
+
+        with patch.object(MemoCore, "solve_models", autospec=True, side_effect=MemoCore.solve_models) as solve_models:
+            for core in (clock, clock, opted_out, opted_out):
+                core.simulate()
+
+        self.assertEqual(solve_models.call_count, 4)
+        self.assertEqual(len(self.memo), 0)
+
+    def test_only_rules_reading_current_time_count(self):
+        commented = self.make_core("commented", "% currentTime(T) is not read here\ncurrentTimeout(3). command(\"look\") :- currentTimeout(T). #show command/1.")
+
+        with patch.object(MemoCore, "solve_models", autospec=True, side_effect=MemoCore.solve_models) as solve_models:
+            commented.simulate()
+            commented.simulate()
+
+        self.assertEqual(solve_models.call_count, 1)
@@ -0,0 +1,45 @@
+from evennia.utils.test_resources import EvenniaTest, EvenniaCommandTest
+
+from prolog.solver_pool import SolverPool, solve_program
+from prolog.symbols import symbol_to_tuple, tuple_to_symbol
+from prolog.budget import SolveBudgetExceeded
+
+import clingo
+
+class TestSolverPool(EvenniaCommandTest):
+    def test_symbols_round_trip(self):
+        symbol = clingo.parse_term('f(1, "thrust n", -g(x), (1, 2), #inf, #sup)')
+
+        self.assertEqual(tuple_to_symbol(symbol_to_tuple(symbol)), symbol)
+        self.assertEqual(symbol_to_tuple(clingo.parse_term('command("look")')), ("command", ("look",)))
+
+    def test_solve_program_returns_plain_tuples(self):
+        models, messages, error = solve_program("seen(X) :- fact(X). #show seen/1.", ["fact(1).", "fact(2)."])
+
+        self.assertEqual(error, None)
+        self.assertEqual(sorted(models[0]), [("seen", (1,)), ("seen", (2,))])
+
+    def test_solve_program_reports_errors(self):
+        models, messages, error = solve_program("thiswill(failNoPeriod)", [])
+
+        self.assertEqual(models, [])
+        self.assertEqual(error != None, True)
+        self.assertEqual(len(messages) > 0, True)
+
+    def test_solve_program_keeps_to_the_budget(self):
+        models, messages, error = solve_program("n(1..10). p(X,Y) :- n(X), n(Y). #show p/2.", [], budget=(None, 50))
+
+        self.assertEqual(models, [])
+        self.assertEqual(isinstance(error, SolveBudgetExceeded), True)
+        self.assertEqual(str(error).startswith("Grounding produced 110 atoms"), True)
+
+    def test_pool_solves_in_another_process(self):
+        pool = SolverPool(processes=1)
+        logged = []
+
+        try:
+            models = pool.solve('command("look"). #show command/1.', [], logger=lambda code, message: logged.append(message))
+        finally:
+            pool.stop()
+
+        self.assertEqual([str(symbol) for symbol in models[0].symbols(shown=True)], ['command("look")'])
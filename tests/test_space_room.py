@@ -6,6 +6,9 @@ from typeclasses.vehicles.base import DefaultSpaceShip
 from typeclasses.objects import Object, SpaceRoom, SpaceRoomDock 
 from typeclasses.objects import CmdPilotLaunch, CmdPilotVehicle, CmdPilotDock
 from prolog.hardcodable import HardcodeProgram
+from prolog.incremental import IncrementalControl
+
+import clingo
 
 class TestSpaceRoom(EvenniaCommandTest):
     def setUp(self):
@@ -109,6 +112,57 @@ class TestSpaceRoom(EvenniaCommandTest):
         # just don't blow up for now.
         self.rendered_map = self.space_room.render_map(caller)
 
+    def legacy_render_map(self, caller):
+        # The per-cell renderer render_map replaced
+        origin_x = caller.location.newtonian_data["x"]
+        origin_y = caller.location.newtonian_data["y"]
+        nearby = self.space_room.get_contents_near_position(origin_x, origin_y)
+
+        rows = [""]
+        for row_y in range(origin_y - 10, origin_y + 10 + 1):
+            output = f"{row_y:+05} | "
+            for x in range(origin_x - 10, origin_x + 10 + 1):
+                here = [item for item in nearby if item.newtonian_data["x"] == x and item.newtonian_data["y"] == row_y]
+                output += "@ " if len(here) > 0 else ". "
+            rows.append(output)
+
+        rows.append("      -------------------------------------------")
+        rows.append(f"                     x:{origin_x:+05}")
+        rows.append("")
+        rows.reverse()
+        return "\n".join(rows)
+
+    def test_render_map_matches_legacy_output(self):
+        self.call(CmdPilotLaunch(), "")
+
+        ship4 = create.create_object( DefaultSpaceShip, key="ship4" )
+        ship5 = create.create_object( DefaultSpaceShip, key="ship5" )
+
+        for ship, x, y in [(self.ship2, 20, 22), (self.ship3, 16, 16), (ship4, 30, 10), (ship5, 31, 20)]:
+            ship.move_to(self.space_room)
+            ship.newtonian_data["x"] = x
+            ship.newtonian_data["y"] = y
+
+        self.assertEqual(self.space_room.render_map(self.char1), self.legacy_render_map(self.char1))
+
+    def test_render_map_zoom_and_radius(self):
+        self.call(CmdPilotLaunch(), "")
+
+        self.ship2.move_to(self.space_room)
+        self.ship2.newtonian_data["x"] = 20 + 95
+        self.ship2.newtonian_data["y"] = 20 - 52
+
+        rows = self.space_room.render_map(self.char1, radius=3, zoom=30).split("\n")
+
+        # label, rule, 7 rows, blank on either end
+        self.assertEqual(len(rows), 11)
+        self.assertEqual(rows[3], "+0110 | . . . . . . . ")
+        self.assertEqual(rows[6], "+0020 | . . . @ . . . ")
+        self.assertEqual(rows[8], "-0040 | . . . . . . @ ")
+
+        # A zoom below 1 renders as zoom 1
+        self.assertEqual(self.space_room.render_map(self.char1, radius=3, zoom=0), self.space_room.render_map(self.char1, radius=3))
+
     def test_docking(self):
         self.call(CmdPilotLaunch(), "")
         self.call(CmdPilotDock(), "")
@@ -119,3 +173,35 @@ class TestSpaceRoom(EvenniaCommandTest):
     def items_length(self, incoming_dict):
         return len(list(incoming_dict.items()))
 
+    def solve_positions(self, solve):
+        positions = []
+        solve(lambda model: positions.extend(str(symbol) for symbol in model.symbols(shown=True)))
+        return sorted(positions)
+
+    def test_incremental_physics_only_regrounds_changed_bodies(self):
+        with open('prolog/moving_bodies_incremental.pl', 'r') as file:
+            control = IncrementalControl(file.read())
+
+        self.assertEqual(control.update({1: (1, 0, 0, 0, 0, 1, 0, 1), 2: (2, 5, 5, 0, 0, 0, 0, 1)}), 2)
+        self.assertEqual(control.update({1: (1, 1, 0, 1, 0, 1, 0, 1), 2: (2, 5, 5, 0, 0, 0, 0, 1)}), 1)
+
+        self.assertEqual(self.solve_positions(control.solve), ["time_body_position(1,1,3,0,2,0)", "time_body_position(1,2,5,5,0,0)"])
+
+        self.assertEqual(control.update({1: (1, 1, 0, 1, 0, 1, 0, 1)}), 0)
+        self.assertEqual(self.solve_positions(control.solve), ["time_body_position(1,1,3,0,2,0)"])
+
+    def test_incremental_physics_matches_reference(self):
+        bodies = [(1, 0, 0, 0, 0, 1, 0, 1), (2, 20, 22, -3, 2, -1, -1, 1), (3, 16, 16, 0, -1, 0, 1, 1)]
+
+        ctl = clingo.Control()
+        ctl.add("base", [], self.space_room.program())
+        for b, ix, iy, ivx, ivy, fx, fy, m in bodies:
+            ctl.add("base", [], f"body({b}, {ix}, {iy}, {ivx}, {ivy}, {fx}, {fy}, {m}, 0).")
+        ctl.ground([("base", [])])
+        reference = self.solve_positions(lambda on_model: ctl.solve(on_model=on_model))
+
+        with open('prolog/moving_bodies_incremental.pl', 'r') as file:
+            control = IncrementalControl(file.read())
+        control.update({body[0]: body for body in bodies})
+
+        self.assertEqual(self.solve_positions(control.solve), reference)
@@ -0,0 +1,85 @@
+from evennia.utils import create
+from evennia.utils.test_resources import EvenniaCommandTest
+
+from typeclasses.objects import SpaceRoom
+from typeclasses.vehicles.base import DefaultSpaceShip
+from prolog.spatial import SpatialGrid
+
+import random
+
+class Point:
+    def __init__(self, id, x, y):
+        self.id = id
+        self.x = x
+        self.y = y
+
+class CountingCells(dict):
+    # The grid's cells, counting the objects in every bucket a query looks through
+    examined = 0
+
+    def get(self, cell, default=None):
+        bucket = super().get(cell, default)
+        self.examined += len(bucket or {})
+        return bucket
+
+class TestSpatialGrid(EvenniaCommandTest):
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(7)
+        self.points = [Point(index, rng.randint(-500, 500), rng.randint(-500, 500)) for index in range(5000)]
+
+        self.grid = SpatialGrid(cell_size=16)
+        for point in self.points:
+            self.grid.place(point, point.x, point.y)
+
+    def scan_box(self, min_x, min_y, max_x, max_y):
+        return [point for point in self.points if min_x <= point.x <= max_x and min_y <= point.y <= max_y]
+
+    def test_queries_match_a_linear_scan(self):
+        for x, y in [(0, 0), (-17, 33), (499, -499), (15, 16)]:
+            self.assertEqual(self.grid.near(x, y, 10), self.scan_box(x - 10, y - 10, x + 10, y + 10))
+            self.assertEqual(self.grid.at(x, y), self.scan_box(x, y, x, y))
+
+        self.assertEqual(self.grid.box(-600, -600, 600, 600), self.points)
+
+    def test_moves_and_removals(self):
+        point = self.points[0]
+        self.grid.place(point, 1000, 1000)
+
+        self.assertEqual(self.grid.at(1000, 1000), [point])
+
+        self.grid.remove(point)
+
+        self.assertEqual(self.grid.at(1000, 1000), [])
+        self.assertEqual(len(self.grid), len(self.points) - 1)
+
+    def test_near_is_cheaper_than_a_scan(self):
+        cells = self.grid.cells = CountingCells(self.grid.cells)
+        found = self.grid.near(0, 0, 10)
+
+        # Only the few cells around the point are looked through, not all 5000 points
+        self.assertEqual(len(found) <= cells.examined, True)
+        self.assertEqual(cells.examined < len(self.points) // 100, True)
+
+class TestSpaceRoomIndex(EvenniaCommandTest):
+    def setUp(self):
+        super().setUp()
+        self.space_room = create.create_object(SpaceRoom, key="space_room")
+        self.ship = create.create_object(DefaultSpaceShip, key="ship")
+        self.ship.move_to(self.space_room)
+
+    def test_index_follows_position_writes(self):
+        self.ship.newtonian_data["x"] = 300
+        self.ship.newtonian_data["y"] = -40
+
+        self.assertEqual(self.space_room.get_contents_at_position(300, -40), [self.ship])
+        self.assertEqual(self.space_room.get_contents_near_position(0, 0), [])
+        self.assertEqual(self.space_room.get_contents_near_position(295, -35), [self.ship])
+
+    def test_index_follows_objects_leaving(self):
+        self.space_room.get_contents_near_position(0, 0)
+        self.ship.move_to(self.room1)
+        self.ship.newtonian_data["x"] = 5
+
+        self.assertEqual(self.space_room.get_contents_near_position(0, 0), [])
+        self.assertEqual(self.ship in self.space_room.spatial_index, False)
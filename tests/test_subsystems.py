@@ -11,6 +11,9 @@ from prolog.hardcodable import Hardcodable, HardcodeProgram
 
 from evennia import TICKER_HANDLER as tickerhandler
 import time
+import clingo
+
+from prolog.symbols import tuple_to_symbol
 
 class TestSubsystems(EvenniaCommandTest):
     def setUp(self):
@@ -20,6 +23,11 @@ class TestSubsystems(EvenniaCommandTest):
         tickerhandler.add = MagicMock(name='add')
         tickerhandler.remove = MagicMock(name='remove')
 
+        # Power grids are ticked by hand here, keep them off the shared clock
+        scheduler = patch("typeclasses.vehicles.base.SCHEDULER")
+        self.scheduler = scheduler.start()
+        self.addCleanup(scheduler.stop)
+
         self.default_vehicle = create.create_object( DefaultSpaceShip, key="ship" )
         self.default_vehicle.aiCore = self.char2
         self.char2.move_to(self.default_vehicle)
@@ -243,3 +251,144 @@ class TestSubsystems(EvenniaCommandTest):
 
         print("\n".join(core.logs))
 
+    def fact_atoms(self, text):
+        ctl = clingo.Control()
+        ctl.add("base", [], text)
+        ctl.ground([("base", [])])
+        return sorted(str(atom.symbol) for atom in ctl.symbolic_atoms)
+
+    def test_to_symbols_matches_to_fact(self):
+        sensors = [self.default_reactor, self.default_battery, self.default_engine, self.default_radar, self.default_vehicle, self.default_core]
+
+        for powered in [True, False]:
+            for sensor in sensors:
+                if sensor != self.default_vehicle:
+                    sensor.powered = powered
+
+                symbols = sorted(str(tuple_to_symbol(symbol)) for symbol in sensor.to_symbols())
+                self.assertEqual(symbols, self.fact_atoms(sensor.to_fact()))
+
+    def test_power_grid_ticks_like_individual_tickers(self):
+        self.call(CmdPowerOnVehicle(), "", caller=self.char2)
+        self.default_reactor.storedFuel = 100
+
+        grid = self.default_vehicle.power_grid()
+        self.assertEqual(grid[:5], [self.default_core, self.default_reactor, self.default_battery, self.default_engine, self.default_radar])
+
+        self.default_vehicle.at_power_tick()
+        self.default_vehicle.at_power_tick()
+        grid_energy = [subsystem.storedEnergy for subsystem in grid[:5]]
+
+        for subsystem in grid[:5]:
+            subsystem.storedEnergy = 0
+        self.default_reactor.storedFuel = 100
+
+        self.run_normal_tick()
+        self.run_normal_tick()
+
+        self.assertEqual([subsystem.storedEnergy for subsystem in grid[:5]], grid_energy)
+
+    def test_power_grid_uses_one_clock_entry_per_vehicle(self):
+        tickerhandler.add.reset_mock()
+        self.scheduler.reset_mock()
+        self.default_vehicle.ndb.power_grid_ticking = False
+
+        self.call(CmdPowerOnVehicle(), "", caller=self.char2)
+
+        self.assertEqual([call.args[0] for call in self.scheduler.register.call_args_list], [self.default_vehicle])
+        self.assertEqual(tickerhandler.add.call_args_list, [])
+        self.assertEqual(self.default_vehicle.simulation_phase, "power")
+
+        self.default_vehicle.stop_power_grid()
+        self.scheduler.unregister.assert_called_with(self.default_vehicle)
+        self.assertFalse(self.default_vehicle.run_simulation())
+
+        # Taken off the clock by the scheduler after a failed tick, powering on registers again
+        self.call(CmdPowerOnVehicle(), "", caller=self.char2)
+        self.default_vehicle.at_simulation_stop()
+        self.scheduler.register.reset_mock()
+        self.default_vehicle.start_power_grid()
+        self.assertEqual([call.args[0] for call in self.scheduler.register.call_args_list], [self.default_vehicle])
+
+    def test_failed_power_grid_tells_whoever_is_aboard(self):
+        self.default_vehicle.start_power_grid()
+
+        with patch.object(self.char2, "msg") as msg:
+            self.default_vehicle.power_tick_failed(ValueError("short circuit"))
+
+        self.assertEqual("Power grid failure: short circuit" in str(msg.call_args_list), True)
+        self.assertEqual(self.default_vehicle.ndb.power_grid_error, "short circuit")
+        self.assertEqual("grid:|rERR" in self.default_vehicle.get_prompt_text(), True)
+        self.assertFalse(self.default_vehicle.run_simulation())
+
+        # Powering on again clears it
+        self.default_vehicle.start_power_grid()
+        self.assertEqual("grid:|rERR" in self.default_vehicle.get_prompt_text(), False)
+
+    def test_power_grid_follows_links(self):
+        grid = self.default_vehicle.power_grid()
+        self.default_battery.unlink(self.default_radar)
+
+        self.assertIsNot(self.default_vehicle.power_grid(), grid)
+        self.assertEqual(self.default_vehicle.power_grid()[-1], self.default_radar)
+
+    def power_state(self, grid):
+        return [(subsystem.powered, subsystem.storedFuel, subsystem.storedEnergy) for subsystem in grid]
+
+    def test_power_grid_solver_matches_sequential(self):
+        self.call(CmdPowerOnVehicle(), "", caller=self.char2)
+        self.default_radar.powerPriority = 1
+        grid = self.default_vehicle.power_grid()
+        start = self.power_state(grid)
+
+        self.assertNotEqual(self.default_vehicle.power_grid_solver().layers, None)
+
+        # The reactor's 30 fuel runs out partway, which hands those ticks to the sequential walk
+        results = {}
+        for solver in ["numpy", "sequential"]:
+            for subsystem, (powered, fuel, energy) in zip(grid, start):
+                subsystem.powered = powered
+                subsystem.assignedEnergyLevel = 1 if powered else 0
+                subsystem.storedFuel = fuel
+                subsystem.storedEnergy = energy
+
+            self.default_vehicle.power_solver = solver
+            results[solver] = []
+            for tick in range(40):
+                if solver == "numpy" and tick == 0:
+                    self.assertTrue(self.default_vehicle.power_grid_solver().solve())
+                else:
+                    self.default_vehicle.at_power_tick()
+                results[solver].append(self.power_state(grid))
+
+        self.assertEqual(results["numpy"], results["sequential"])
+        self.assertFalse(self.default_reactor.powered)
+
+    def test_power_priority_feeds_higher_first(self):
+        self.call(CmdPowerOnVehicle(), "", caller=self.char2)
+        self.default_radar.powerPriority = 1
+
+        self.assertEqual(self.default_battery.prioritized_links(), [self.default_radar, self.default_engine])
+
+        # Keep everything but the battery's transfers still
+        self.default_reactor.storedFuel = 100
+        self.default_reactor.energyProvidedPerTick = 0
+        self.default_reactor.energyTransferredPerTick = 0
+        self.default_engine.energyConsumedPerTickPerLevel = 0
+        self.default_radar.energyConsumedPerTickPerLevel = 0
+
+        for solver in ["numpy", "sequential"]:
+            self.default_vehicle.power_solver = solver
+            self.default_battery.storedEnergy = 3
+            self.default_engine.storedEnergy = 1
+            self.default_radar.storedEnergy = 1
+
+            self.default_vehicle.at_power_tick()
+
+            self.assertEqual((self.default_battery.storedEnergy, self.default_radar.storedEnergy, self.default_engine.storedEnergy), (0, 4, 1))
+
+    def test_power_grid_solver_declines_shared_receivers(self):
+        self.default_reactor.link_to(self.default_radar)
+
+        self.assertEqual(self.default_vehicle.power_grid_solver().layers, None)
+        self.assertFalse(self.default_vehicle.power_grid_solver().solve())
@@ -0,0 +1,92 @@
+from evennia.utils import create
+from evennia.utils.test_resources import EvenniaCommandTest
+
+from typeclasses.objects import SpaceRoom, CmdPilotPredict
+from typeclasses.vehicles.base import DefaultSpaceShip
+from prolog.physics import NumpyBackend
+from prolog.symbols import tuple_to_symbol
+from prolog.trajectory import Trajectory, TrajectoryCache
+from prolog.scheduler import SCHEDULER
+
+import clingo
+import random
+import time
+
+class TestTrajectory(EvenniaCommandTest):
+    def test_closed_form_matches_stepping(self):
+        backend = NumpyBackend()
+        rng = random.Random(21)
+
+        for _ in range(50):
+            body = (1, rng.randint(-500, 500), rng.randint(-500, 500), rng.randint(-9, 9), rng.randint(-9, 9), rng.randint(-20, 20), rng.randint(-20, 20), rng.randint(1, 7))
+            trajectory = Trajectory(0, body)
+            state = body
+
+            for step in range(1, 40):
+                _, px, py, vx, vy = backend.step({1: state})[0]
+                state = (1, px, py, vx, vy) + body[5:]
+
+                self.assertEqual(trajectory.state(step), (px, py, vx, vy))
+
+    def test_cache_follows_the_force(self):
+        cache = TrajectoryCache()
+        body = (1, 0, 0, 0, 0, 2, -1, 1)
+
+        cache.predict(0, body, 30)
+        # Three steps later, still on the cached path
+        moved = (1,) + Trajectory(0, body).state(3) + body[5:]
+        self.assertEqual(cache.predict(3, moved, 27), cache.predict(0, body, 30))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+        # Thrust changed
+        cache.predict(3, moved[:5] + (0, 0, 1), 10)
+        self.assertEqual(cache.misses, 2)
+
+        # Moved by something other than physics, docking say
+        cache.predict(3, (1, 50, 50, 0, 0, 0, 0, 1), 10)
+        self.assertEqual(cache.misses, 3)
+
+class TestSpaceRoomPredictions(EvenniaCommandTest):
+    def setUp(self):
+        super().setUp()
+        self.space_room = create.create_object(SpaceRoom, key="space_room")
+        self.space_room.physics_backend = "numpy"
+
+        self.ship = create.create_object(DefaultSpaceShip, key="ship")
+        self.ship.move_to(self.space_room)
+
+        # Step the room by hand only
+        SCHEDULER.unregister(self.space_room)
+        while id(self.space_room) in SCHEDULER.in_flight:
+            time.sleep(0.01)
+
+        self.ship.newtonian_data.update(x=5, y=-3, Vx=1, Vy=0, Fx=1, Fy=-2)
+
+    def test_prediction_matches_the_simulation(self):
+        predicted = self.space_room.predict_position(self.ship, 8)
+        self.assertEqual(self.space_room.predict_positions(8)[self.ship.id], predicted)
+
+        for _ in range(8):
+            self.space_room.simulate()
+
+        data = self.ship.newtonian_data
+        self.assertEqual((data["x"], data["y"], data["Vx"], data["Vy"]), predicted)
+        self.assertEqual(self.space_room.trajectories.misses, 1)
+
+    def test_predictions_reach_core_facts(self):
+        self.ship.prediction_horizons = [1, 10]
+        symbols = [str(tuple_to_symbol(symbol)) for symbol in self.ship.to_symbols()]
+
+        px, py, _, _ = self.space_room.predict_position(self.ship, 10)
+        self.assertEqual(f"predicted_position({self.ship.id},10,{px},{py})" in symbols, True)
+
+        ctl = clingo.Control()
+        ctl.add("base", [], self.ship.to_fact())
+        ctl.ground([("base", [])])
+        self.assertEqual(sorted(str(atom.symbol) for atom in ctl.symbolic_atoms), sorted(symbols))
+
+    def test_predict_command(self):
+        self.char1.move_to(self.ship, quiet=True)
+
+        self.call(CmdPilotPredict(), "3", "In 3 ticks: Pos: 14,-15 Velocity: 4,-6", caller=self.char1)
+        self.call(CmdPilotPredict(), "zero", "Usage: predict [ticks]", caller=self.char1)
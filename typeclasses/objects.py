@@ -54,6 +54,14 @@ COMMAND_DEFAULT_CLASS = utils.class_from_module(settings.COMMAND_DEFAULT_CLASS)
 from commands.command import Command
 
 from prolog.simulatable import Simulatable
+from prolog.kinematics import KinematicProperty
+from prolog.scheduler import SCHEDULER
+from prolog.reactor import MAILBOX
+from prolog.spatial import SpatialGrid
+from prolog.trajectory import TrajectoryCache
+from prolog.physics import PhysicsBackend, make_backend, REFERENCE_PROGRAM
+from prolog.program_cache import PROGRAM_CACHE, PROGRAM_STORE
+from prolog.solve_memo import SOLVE_MEMO
 
 
 class Vehicle:
@@ -63,7 +71,7 @@ class DefaultRadar:
     pass
 
 # Pearl clutch! I know, I re-opened the class. I'm a dirty rubyist at heart. 
-DefaultRoom.newtonian_data = NAttributeProperty(default={"x": 0, "y": 0, "Fx": 0, "Fy": 0, "Vx": 0, "Vy": 0})
+DefaultRoom.newtonian_data = KinematicProperty(default={"x": 0, "y": 0, "Fx": 0, "Fy": 0, "Vx": 0, "Vy": 0})
 
 class ObjectParent:
     """
@@ -75,7 +83,8 @@ class ObjectParent:
     take precedence.
 
     """
-    newtonian_data = NAttributeProperty(default={"x": 0, "y": 0, "Fx": 0, "Fy": 0, "Vx": 0, "Vy": 0, "wasMoving": False})
+    # Read through to an in-memory KinematicState, not persisted across reloads
+    newtonian_data = KinematicProperty(default={"x": 0, "y": 0, "Fx": 0, "Fy": 0, "Vx": 0, "Vy": 0, "wasMoving": False})
 
 
 class Object(ObjectParent, DefaultObject):
@@ -258,6 +267,31 @@ class CmdBootstrapSpaceroom(Command):
         dock.move_to(room1)
         room1.move_to(space_room)
 
+class CmdSimulationStats(Command):
+    """
+    Superuser command showing the health of the shared simulation scheduler.
+
+    Usage:
+        simstats
+    """
+    key = "simstats"
+
+    locks = "cmd::perm(Builder)"
+
+    help_category = "Builder Utilities"
+
+    def func(self):
+        stats = SCHEDULER.stats()
+
+        self.caller.msg("|ySimulation Scheduler:")
+        self.caller.msg(f"Registered: {stats['registered']} Workers: {stats['workers']} Queue Depth: {stats['queue_depth']}")
+        self.caller.msg(f"Ticks: {stats['ticks']} Skipped: {stats['skipped']} Overruns: {stats['overruns']}")
+        self.caller.msg(f"Tick Latency: {stats['last_tick_latency'] * 1000:.1f}ms (max {stats['max_tick_latency'] * 1000:.1f}ms)")
+        self.caller.msg(f"Reactor Mailbox: {MAILBOX.delivered} results in {MAILBOX.deliveries} batches, {MAILBOX.coalesced} coalesced, {len(MAILBOX)} waiting")
+        self.caller.msg(f"Tick Lag: {stats['last_lag'] * 1000:.1f}ms (mean {stats['mean_lag'] * 1000:.1f}ms, max {stats['max_lag'] * 1000:.1f}ms) Overrun Rate: {stats['overrun_rate'] * 100:.1f}% Dropped: {stats['dropped']}")
+        self.caller.msg(f"Program Store: {len(PROGRAM_STORE)} distinct programs, {PROGRAM_STORE.hits} shared, {PROGRAM_STORE.misses} parsed")
+        self.caller.msg(f"Solve Memo: {len(SOLVE_MEMO)}/{SOLVE_MEMO.capacity} results, {SOLVE_MEMO.hits} hits, {SOLVE_MEMO.misses} misses")
+
 class CmdPilotVehicle(COMMAND_DEFAULT_CLASS):
     """
     Begin piloting a vehicle.
@@ -425,6 +459,43 @@ class CmdPilotDock(Command):
         ship.msg_contents("Ship could not find a dock.")
         return False
 
+class CmdPilotPredict(Command):
+    """
+    Predict where the vehicle will be if its thrust stays as it is.
+
+    Usage:
+        predict
+        predict 30
+    """
+
+    key = "predict"
+
+    locks = "cmd:all()"
+    help_category = "Piloting"
+
+    max_ticks = 1000
+
+    def func(self):
+        caller = self.caller
+        ship = caller.location
+        space_room = ship.location if ship else None
+
+        if not isinstance(space_room, SpaceRoom):
+            caller.msg("Predictions are only available in space.")
+            return False
+
+        arg = self.args.strip()
+
+        if arg and not (arg.isdigit() and 0 < int(arg) <= self.max_ticks):
+            caller.msg(f"Usage: predict [ticks], from 1 to {self.max_ticks}.")
+            return False
+
+        ticks = int(arg) if arg else 10
+        px, py, vx, vy = space_room.predict_position(ship, ticks)
+
+        caller.msg(f"In {ticks} ticks: |rPos: {px},{py} |bVelocity: {vx},{vy}|n")
+        return True
+
 class CmdRadarPulse(Command):
     """
     Pulses the radar, allowing you to "see" around your ship.
@@ -550,6 +621,7 @@ class VehiclePilotingCmdSet(CmdSet):
         self.add(CmdPowerOffVehicle())
         self.add(CmdPilotLaunch())
         self.add(CmdPilotDock())
+        self.add(CmdPilotPredict())
 
 class VehicleEntryCmdSet(CmdSet):
     def at_cmdset_creation(self):
@@ -559,10 +631,24 @@ class SpaceRoom(DefaultRoom, Simulatable):
     width = AttributeProperty(default=1000)
     height = AttributeProperty(default=1000)
 
+    # Which prolog.physics backend steps the bodies in this room:
+    # "clingo" (reference, re-grounds every tick), "incremental" or "numpy".
+    physics_backend = AttributeProperty(default="incremental")
+
+    # Bodies move after power grids tick and before core programs run
+    simulation_phase = "physics"
+
+    # Side of a spatial_index cell, proximity queries only look at the cells they overlap
+    spatial_cell_size = 16
+
     def at_server_reload(self):
         print("Simulation needs to cleaup! reload happening!")
 
         self.to_simulate = {}
+        self._spatial_index = None
+        self._trajectories = None
+        self.ndb.physics = None
+        self.ndb.physics_backend = None
 
         return True
 
@@ -573,40 +659,126 @@ class SpaceRoom(DefaultRoom, Simulatable):
                 self.track(item)
         return True
 
+    @property
+    def spatial_index(self):
+        # Built from contents on first use, then kept current as positions are written and
+        # objects move in or out. create_object(location=...) skips the move hooks, so
+        # call index_object() for anything put here that way once the index exists.
+        grid = getattr(self, "_spatial_index", None)
+
+        if grid == None:
+            grid = self._spatial_index = SpatialGrid(cell_size=self.spatial_cell_size)
+
+            for item in self.contents:
+                self.index_object(item)
+
+        return grid
+
+    def index_object(self, item):
+        if not hasattr(item, "newtonian_data"):
+            return
+
+        grid = self.spatial_index
+        data = item.newtonian_data
+        grid.place(item, data["x"], data["y"])
+        data.watcher = lambda state: grid.place(item, state["x"], state["y"])
+
+    def unindex_object(self, item):
+        grid = getattr(self, "_spatial_index", None)
+
+        if grid != None and item in grid:
+            grid.remove(item)
+            item.newtonian_data.watcher = None
+
+    @property
+    def trajectories(self):
+        cache = getattr(self, "_trajectories", None)
+
+        if cache == None:
+            cache = self._trajectories = TrajectoryCache()
+
+        return cache
+
+    @property
+    def physics_step(self):
+        # Physics steps applied since the server started, the clock trajectories are anchored to
+        return getattr(self, "_physics_step", 0)
+
+    def predict_position(self, item, ahead):
+        # (Px, Py, Vx, Vy) of item `ahead` ticks from now if its force stays the same
+        return self.trajectories.predict(self.physics_step, item.to_body(), ahead)
+
+    def predict_positions(self, ahead):
+        # {id: (Px, Py, Vx, Vy)} for every body in the room, in one pass
+        step = self.physics_step
+        trajectories = self.trajectories
+
+        return {
+            item.id: trajectories.predict(step, item.to_body(), ahead)
+            for item in self.simulation_scope() if hasattr(item, "to_body")
+        }
+
     def program(self):
-        with open('prolog/moving_bodies_simulation.pl', 'r') as file:
-            content = file.read()
-        return content
+        return PROGRAM_CACHE.text(REFERENCE_PROGRAM)
+
+    def physics(self):
+        backend_name = self.physics_backend
+
+        # Compare against the requested name, make_backend may have fallen back to another
+        if self.ndb.physics == None or self.ndb.physics_backend != backend_name:
+            self.ndb.physics = make_backend(backend_name, logger=self.control_logger_callback)
+            self.ndb.physics_backend = backend_name
+
+        return self.ndb.physics
+
+    def simulate(self):
+        if self.failure:
+            return False
+
+        bodies = {}
+        for item in self.simulation_scope():
+            if hasattr(item, "to_body"):
+                bodies[item.id] = item.to_body()
+
+        positions = self.physics().step(bodies)
+
+        # Applied on the reactor thread with the rest of the tick, newest positions win
+        MAILBOX.post(self.apply_positions, positions, key=(id(self), "positions"), on_error=self.record_failure)
 
     def update(self, model):
-        for fact in model.symbols(shown=True):
-            # print(fact)
-            # time_body_position(T, B, Px, Py, Vx, Vy)
-            # time_body_position(1,14,20,22,0,0)
-            time_step, body, px, py, vx, vy = [int(strPart) for strPart in str(fact).replace("time_body_position(", "").replace(")", "").split(",")]
-
-            if body in self.to_simulate:
-                entity = self.to_simulate[body]
-
-                fx = entity.newtonian_data["Fx"]
-                fy = entity.newtonian_data["Fy"]
-                entity.newtonian_data["x"] = px
-                entity.newtonian_data["y"] = py
-                entity.newtonian_data["Vx"] = vx
-                entity.newtonian_data["Vy"] = vy
-
-                if vx > 0 or vx < 0 or vy > 0 or vy < 0:
-                    entity.newtonian_data["wasMoving"] = True
-                    if hasattr(entity, "aiCore"):
+        # Reference path: a solved moving_bodies_simulation.pl model
+        self.apply_positions(PhysicsBackend.decode(model))
+
+    def apply_positions(self, positions):
+        tracked = self.to_simulate
+        self._physics_step = self.physics_step + 1
+
+        for body, px, py, vx, vy in positions:
+            entity = tracked.get(body)
+
+            if entity != None:
+                # One attribute lookup and one write per body
+                data = entity.newtonian_data
+                fx = data["Fx"]
+                fy = data["Fy"]
+                moving = vx != 0 or vy != 0
+                was_moving = data.get("wasMoving")
+
+                data.update(x=px, y=py, Vx=vx, Vy=vy, wasMoving=moving)
+
+                if moving:
+                    if getattr(entity, "aiCore", None) != None:
                         entity.aiCore.update_status()
                 else:
-                    if entity.newtonian_data["wasMoving"] == True:
-                        entity.newtonian_data["wasMoving"] = False
+                    if was_moving == True:
                         entity.msg_contents(f"You have come to rest. \n|rPos: {px},{py} |bVelocity: {vx},{vy} |gForce: {fx}, {fy}|n")
 
 
     def at_object_leave(self, moved_obj, target_location, move_type="move", **kwargs):
         try:
+            self.unindex_object(moved_obj)
+            self.trajectories.discard(moved_obj.id)
+
             if hasattr(moved_obj, "newtonian_data") and hasattr(moved_obj, "to_fact"):
                 self.ignore(moved_obj)
         except Exception as e:
@@ -623,71 +795,59 @@ class SpaceRoom(DefaultRoom, Simulatable):
         finally:
             return True
 
+    def at_object_receive(self, moved_obj, source_location, move_type="move", **kwargs):
+        try:
+            if getattr(self, "_spatial_index", None) != None:
+                self.index_object(moved_obj)
+        except Exception as e:
+            print(e)
+
     def item_nearby(self, item, x, y):
         return item.newtonian_data["x"] <= x + 10 and item.newtonian_data["x"] >= x - 10 and item.newtonian_data["y"] <= y + 10 and item.newtonian_data["y"] >= y - 10
 
     def get_contents_at_position(self, x, y):
-        items = []
-        for item in self.contents:
-            if item.newtonian_data["x"] == x and item.newtonian_data["y"] == y:
-                items.append(item)
-
-        return items
+        return self.spatial_index.at(x, y)
 
-    def get_contents_near_position(self, x, y):
-        nearby = []
-        for item in self.contents:
-            if self.item_nearby(item, x, y):
-                nearby.append(item)
+    def get_contents_near_position(self, x, y, radius=10):
+        return self.spatial_index.near(x, y, radius)
 
-        return nearby
+    def get_contents_in_box(self, min_x, min_y, max_x, max_y):
+        return self.spatial_index.box(min_x, min_y, max_x, max_y)
 
     def symbol_for_obj(self, obj):
         pass
 
-    def objects_here(self, x, y, nearby):
-        objects = []
-        for item in nearby:
-            if item.newtonian_data["x"] == x and item.newtonian_data["y"] == y:
-                objects.append(item)
-
-        return objects
-
-
-    def render_row(self, row_y, origin_x, nearby):
-        output = f"{row_y:+05} | "
-        empty_space = ". "
-
-        for i in range(origin_x - 10,origin_x + 10 + 1):
-            objects_at_location = self.objects_here(i, row_y, nearby)
-            if len(objects_at_location) > 0:
-                output += "@ "
-            else:
-                output += empty_space
-
-        return output
-
-    def render_map(self, caller=None):
+    def render_map(self, caller=None, radius=10, zoom=1):
         if caller == None:
             return None
 
         origin_x = caller.location.newtonian_data["x"]
         origin_y = caller.location.newtonian_data["y"]
 
-        # get contents
-        nearby = self.get_contents_near_position(origin_x, origin_y)
+        # scanZoom is builder-settable, anything below 1 would divide by zero
+        zoom = max(zoom, 1)
 
-        rows = []
+        # Every cell covers zoom x zoom units centred on origin + cell * zoom, so
+        # the default radius 10, zoom 1 map is the 21x21 units around the caller.
+        half = zoom // 2
+        low = radius * zoom + half
+        high = radius * zoom + zoom - 1 - half
 
-        rows.append("")
-        for i in range(origin_y - 10, origin_y + 10 + 1):
-            rows.append(self.render_row(i, origin_x, nearby))
+        # Bucket what's in range into cells in one pass
+        occupied = set()
+        for item in self.get_contents_in_box(origin_x - low, origin_y - low, origin_x + high, origin_y + high):
+            data = item.newtonian_data
+            occupied.add(((data["x"] - origin_x + half) // zoom, (data["y"] - origin_y + half) // zoom))
 
-        rows.append("      -------------------------------------------")
-        rows.append(f"                     x:{origin_x:+05}")
-        rows.append("")
+        columns = range(-radius, radius + 1)
+
+        rows = ["", " " * (2 * radius + 1) + f"x:{origin_x:+05}", "      " + "-" * (4 * radius + 3)]
 
-        rows.reverse()
+        for row in range(radius, -radius - 1, -1):
+            cells = "".join(["@ " if (column, row) in occupied else ". " for column in columns])
+            rows.append(f"{origin_y + row * zoom:+05} | " + cells)
+
+        rows.append("")
         return "\n".join(rows)
 
 class SpaceRoomDock(Object):
@@ -7,6 +7,9 @@ from ..characters import Character
 from ..objects import Object
 
 from prolog.hardcodable import Hardcodable, HardcodeProgram
+from prolog.reactor import MAILBOX
+from prolog.symbols import constant
+from prolog.checkpoint import CheckpointedAttributeProperty, flush_checkpoints, discard_checkpoints
 
 from textwrap import dedent
 import random
@@ -17,7 +20,8 @@ class Subsystem(Object):
     HUDname = AttributeProperty(default="subname")
 
     fuelCapacity = AttributeProperty(default=0)
-    storedFuel = AttributeProperty(default=0)
+    # Hot counters, written every tick: kept in memory and checkpointed to the database
+    storedFuel = CheckpointedAttributeProperty(default=0)
 
     fuelConsumedPerTickPerLevel = AttributeProperty(default=0)
 
@@ -31,10 +35,13 @@ class Subsystem(Object):
 
     linkedSubsystems = AttributeProperty(default=[])
 
+    # Linked subsystems with higher priority are fed first
+    powerPriority = AttributeProperty(default=0)
+
     # Represents basic capacitor storage within the subsystem's circuitry
     energyCapacity = AttributeProperty(default=10)
 
-    storedEnergy = AttributeProperty(default=0)
+    storedEnergy = CheckpointedAttributeProperty(default=0)
 
     powered = AttributeProperty(default=False)
 
@@ -61,6 +68,7 @@ class Subsystem(Object):
 
         self.db.linkedSubsystems.append(receiver)
         self.save()
+        self.invalidate_power_grid()
         return True
 
     def unlink(self, receiver):
@@ -70,15 +78,34 @@ class Subsystem(Object):
         if receiver in self.db.linkedSubsystems:
             self.db.linkedSubsystems.remove(receiver)
 
+        self.invalidate_power_grid()
+
+    def on_power_grid(self):
+        # Subsystems inside a vehicle are ticked by the vehicle's power grid, not their own ticker
+        return hasattr(self.location, "at_power_tick")
+
+    def invalidate_power_grid(self):
+        if self.on_power_grid():
+            self.location.invalidate_power_grid()
+
+    def at_object_delete(self):
+        self.invalidate_power_grid()
+        discard_checkpoints(self)
+        return True
+
+    def at_idmapper_flush(self):
+        # Leaving the cache, persist in-memory counters so a reloaded instance sees them
+        flush_checkpoints(self)
+        return super().at_idmapper_flush()
+
     # TODO: Handle damaging power levels
     def at_tick(self):
         # Generate Energy
         if self.energyProvidedPerTick > 0:
             self.generate_energy()
 
-        # loop over each connected subsystem
-        # TODO: Priority order
-        for subsystem in self.linkedSubsystems:
+        # loop over each connected subsystem, highest priority first
+        for subsystem in self.prioritized_links():
             # Transfer energy
             if self.energyTransferredPerTick > 0:
                 self.transfer_energy(subsystem)
@@ -89,6 +116,10 @@ class Subsystem(Object):
 
         pass
 
+    def prioritized_links(self):
+        # Stable, so equal priorities keep their link order
+        return sorted(self.linkedSubsystems or [], key=lambda subsystem: -subsystem.powerPriority)
+
     def generate_energy(self):
         fuel_draw = self.fuelConsumedPerTickPerLevel * self.assignedEnergyLevel
 
@@ -134,7 +165,18 @@ class Subsystem(Object):
         pass
 
     def at_power_on(self):
-        tickerhandler.add(1, self.at_tick)
+        if self.on_power_grid():
+            self.location.start_power_grid()
+
+            # Drop the per-subsystem ticker this subsystem may have persisted before power grids.
+            # A subsystem that never had one is the usual case.
+            try:
+                tickerhandler.remove(1, self.at_tick)
+            except KeyError:
+                pass
+        else:
+            tickerhandler.add(1, self.at_tick)
+
         self.powered = True
         self.assignedEnergyLevel = 1
 
@@ -161,6 +203,8 @@ class Subsystem(Object):
         self.assignedEnergyLevel = 0
         self.storedEnergy = 0
 
+        flush_checkpoints(self)
+
 class DefaultEngine(Subsystem):
     energyCapacity = AttributeProperty(default=10)
     energyConsumedPerTickPerLevel = AttributeProperty(default=1)
@@ -179,6 +223,12 @@ class DefaultEngine(Subsystem):
         else:
             return "engine(off)."
 
+    def to_symbols(self):
+        if self.powered:
+            return [("engine", (constant(self.HUDname), self.thrustOutputPerLevel, self.energyConsumedPerTickPerLevel, self.energyCapacity, self.storedEnergy))]
+        else:
+            return [("engine", (constant("off"),))]
+
     def status(self):
         if self.powered:
             forcex = self.location.newtonian_data["Fx"]
@@ -387,14 +437,24 @@ class DefaultCore(Subsystem, Hardcodable, Character):
         if hasattr(self.location, "to_fact"):
             return self.location.to_fact()
         else:
-            self.msg("|yYou have not been installed into a location with sensors. |nYou should |rpanic.")
+            MAILBOX.post(self.msg, "|yYou have not been installed into a location with sensors. |nYou should |rpanic.")
+            return ""
+
+    def to_symbols(self):
+        if hasattr(self.location, "to_symbols"):
+            return self.location.to_symbols()
+        elif hasattr(self.location, "to_fact"):
+            return None
+        else:
+            MAILBOX.post(self.msg, "|yYou have not been installed into a location with sensors. |nYou should |rpanic.")
+            return []
 
 class DefaultReactor(Subsystem):
     energyProvidedPerTick = AttributeProperty(default=10)
     energyTransferredPerTick = AttributeProperty(default=10)
     energyConsumedPerTickPerLevel = AttributeProperty(default=0)
     fuelConsumedPerTickPerLevel = AttributeProperty(default=1)
-    storedFuel = AttributeProperty(default=30)
+    storedFuel = CheckpointedAttributeProperty(default=30)
     energyCapacity = AttributeProperty(default=10)
     HUDname = "reactor"
     name = "Stock Reactor"
@@ -409,6 +469,12 @@ class DefaultReactor(Subsystem):
         else:
             return "reactor(off)."
 
+    def to_symbols(self):
+        if self.powered:
+            return [("reactor", (constant(self.HUDname), self.energyProvidedPerTick, self.energyTransferredPerTick, self.energyConsumedPerTickPerLevel, self.fuelConsumedPerTickPerLevel, self.storedFuel, self.energyCapacity, self.storedEnergy))]
+        else:
+            return [("reactor", (constant("off"),))]
+
     def status(self):
         if self.powered:
             return f"react:F({self.storedFuel})"
@@ -432,6 +498,12 @@ class DefaultBattery(Subsystem):
         else:
             return "battery(off)."
 
+    def to_symbols(self):
+        if self.powered:
+            return [("battery", (constant(self.HUDname), self.energyTransferredPerTick, self.energyCapacity, self.storedEnergy))]
+        else:
+            return [("battery", (constant("off"),))]
+
     def status(self):
         if self.powered:
             return f"bat:E({self.storedEnergy})"
@@ -443,6 +515,10 @@ class DefaultRadar(Subsystem):
     energyConsumedPerTickPerLevel = AttributeProperty(default=1)
     name = "Stock Radar"
     HUDname = "radar"
+
+    # Pulse map reach in cells either side of the ship, and world units per cell
+    scanRadius = AttributeProperty(default=10)
+    scanZoom = AttributeProperty(default=1)
     provides_cmdset_named = "typeclasses.objects.RadarCmdSet"
 
     def to_fact(self):
@@ -463,6 +539,12 @@ class DefaultRadar(Subsystem):
         else:
             return "radar(off)."
 
+    def to_symbols(self):
+        if self.powered:
+            return [("radar", (constant(self.HUDname), self.energyConsumedPerTickPerLevel, self.energyCapacity, self.storedEnergy))]
+        else:
+            return [("radar", (constant("off"),))]
+
     def pulse(self, caller, space_room):
         power_draw = self.energyConsumedPerTickPerLevel * self.assignedEnergyLevel
 
@@ -470,7 +552,7 @@ class DefaultRadar(Subsystem):
             self.storedEnergy -= power_draw
             # Basic implementation, render the map perfectly from the space_room
             caller.msg("")
-            caller.msg(space_room.render_map(caller))
+            caller.msg(space_room.render_map(caller, radius=self.scanRadius, zoom=self.scanZoom))
             caller.msg("|GRadar pulse executed successfully.")
 
         else:
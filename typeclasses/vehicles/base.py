@@ -3,6 +3,9 @@ from evennia import TICKER_HANDLER as tickerhandler
 
 from typeclasses.objects import Object
 from typeclasses.subsystems.base import Subsystem
+from prolog.power_grid import PowerGridSolver
+from prolog.scheduler import SCHEDULER
+from prolog.reactor import MAILBOX
 
 import evennia
 
@@ -15,12 +18,41 @@ class Vehicle(Object):
     
     aiCore = AttributeProperty(None)
 
+    # "numpy" solves each power tick with PowerGridSolver, "sequential" walks the grid
+    power_solver = AttributeProperty("numpy")
+
+    # Power grids tick first on the shared simulation clock
+    simulation_phase = "power"
+
+    # Ticks ahead to publish predicted_position(B, T, Px, Py) facts for while in space
+    prediction_horizons = AttributeProperty([10, 30])
+
+    def to_body(self):
+        # (B, Ix, Iy, IVx, IVy, Fx, Fy, M)
+        data = self.newtonian_data
+        return (self.id, data['x'], data['y'], data['Vx'], data['Vy'], data['Fx'], data['Fy'], 1)
+
+    def predictions(self):
+        # [(T, Px, Py)] for each horizon, from the room's trajectory cache. Empty outside space.
+        predict = getattr(self.location, "predict_position", None)
+
+        if predict == None:
+            return []
+
+        return [(ahead,) + predict(self, ahead)[:2] for ahead in self.prediction_horizons or []]
+
     def to_fact(self):
+        b, ix, iy, ivx, ivy, fx, fy, m = self.to_body()
+        predicted = "".join(f"predicted_position({b}, {t}, {px}, {py}).\n" for t, px, py in self.predictions())
         return dedent(f"""
         %    (B, Ix, Iy, IVx, IVy, Fx, Fy, M, T)
         %body(1, 0,  0,  0,   0,   1,  0,  1, 0).
-        body({self.id}, {self.newtonian_data['x']}, {self.newtonian_data['y']}, {self.newtonian_data['Vx']}, {self.newtonian_data['Vy']}, {self.newtonian_data['Fx']}, {self.newtonian_data['Fy']}, 1, 0).
-        """)
+        body({b}, {ix}, {iy}, {ivx}, {ivy}, {fx}, {fy}, {m}, 0).
+        """) + predicted
+
+    def to_symbols(self):
+        body = self.to_body()
+        return [("body", body + (0,))] + [("predicted_position", (body[0],) + prediction) for prediction in self.predictions()]
 
     def update_prompt(self, caller):
         if self.aiCore:
@@ -43,6 +75,9 @@ class Vehicle(Object):
         if self.nattributes.get("pos") != None:
             position_string = f" x:{self.nattributes.pos['x']},y:{self.nattributes.pos['y']}"
 
+        if self.ndb.power_grid_error != None:
+            full_subsystems_text += " [grid:|rERR|n]"
+
         return f"{self.name}{position_string} {powered_color}{powered_text}|n {full_subsystems_text}] >\n"
 
     def get_display_desc(self, looker, **kwargs):
@@ -68,6 +103,105 @@ class Vehicle(Object):
 
         self.cmdset.add("typeclasses.objects.VehiclePilotingCmdSet", persistent=True)
 
+    def power_grid(self):
+        # Subsystems in tick order: breadth first from the core along links, then anything
+        # not linked in. Kept in memory until links, contents or the core change.
+        cached = getattr(self, "_power_grid", None)
+
+        if cached != None and cached[0] == self.aiCore:
+            return cached[1]
+
+        grid = []
+        seen = set()
+        queue = [self.aiCore]
+
+        while queue:
+            subsystem = queue.pop(0)
+
+            if subsystem == None or subsystem.id in seen or subsystem.location != self:
+                continue
+
+            seen.add(subsystem.id)
+            grid.append(subsystem)
+            queue += list(subsystem.linkedSubsystems or [])
+
+        for item in self.contents:
+            if isinstance(item, Subsystem) and item.id not in seen:
+                grid.append(item)
+
+        self._power_grid = (self.aiCore, grid)
+        return grid
+
+    def invalidate_power_grid(self):
+        self._power_grid = None
+        self._power_grid_solver = None
+
+    def start_power_grid(self):
+        # One entry per vehicle on the simulation clock instead of a ticker per subsystem
+        if not self.ndb.power_grid_ticking:
+            self.ndb.power_grid_ticking = True
+            self.ndb.power_grid_error = None
+            # Not straight away, the rest of the grid may still be powering on
+            SCHEDULER.register(self, run_now=False)
+
+    def stop_power_grid(self):
+        self.ndb.power_grid_ticking = False
+        SCHEDULER.unregister(self)
+
+    def at_simulation_stop(self):
+        # Off the clock, whether stopped here or by the scheduler after a failed
+        # tick, so the next power on registers again
+        self.ndb.power_grid_ticking = False
+
+    def run_simulation(self):
+        # Called by the scheduler in the power phase of every tick. The tick itself
+        # runs on the reactor, ahead of the physics and programs results of the tick.
+        MAILBOX.post(self.at_power_tick, key=(id(self), "power"), on_error=self.power_tick_failed)
+        return self.wants_simulation()
+
+    def power_tick_failed(self, error):
+        # A grid that can't tick comes off the clock until it's powered on again. The
+        # error stays on the vehicle for its prompt, and everyone aboard hears of it.
+        print(f"Power grid of {self} failed: {error}")
+        self.ndb.power_grid_error = str(error)
+        self.msg_contents(f"|rPower grid failure: {error}")
+        self.stop_power_grid()
+
+    def wants_simulation(self):
+        return bool(self.ndb.power_grid_ticking)
+
+    def power_grid_solver(self):
+        # Replanned whenever the grid is invalidated or a priority changes
+        grid = self.power_grid()
+        solver = getattr(self, "_power_grid_solver", None)
+
+        if solver == None or not solver.is_current(grid):
+            solver = self._power_grid_solver = PowerGridSolver(grid, Subsystem)
+
+        return solver
+
+    def at_power_tick(self):
+        grid = self.power_grid()
+
+        if not any(subsystem.powered for subsystem in grid):
+            self.stop_power_grid()
+            return
+
+        if self.power_solver == "numpy" and self.power_grid_solver().solve():
+            return
+
+        for subsystem in grid:
+            if subsystem.powered:
+                subsystem.at_tick()
+
+    def at_object_receive(self, moved_obj, source_location, move_type="move", **kwargs):
+        if isinstance(moved_obj, Subsystem):
+            self.invalidate_power_grid()
+
+    def at_object_leave(self, moved_obj, target_location, move_type="move", **kwargs):
+        if isinstance(moved_obj, Subsystem):
+            self.invalidate_power_grid()
+
     def chained_power(self, subsys, powerOn):
         if subsys:
             if powerOn:
@@ -90,6 +224,8 @@ class Vehicle(Object):
         self.chained_power(self.aiCore, False)
 
     def at_object_delete(self):
+        self.stop_power_grid()
+
         for cur_system in self.contents:
             if cur_system:
                 cur_system.location = evennia.settings.DEFAULT_HOME